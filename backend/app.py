@@ -1,57 +1,158 @@
+import asyncio
 import json
 import os
 import random
+import threading
 import time
+import zlib
 from datetime import datetime
 from pathlib import Path
+from contextlib import aclosing, asynccontextmanager
 from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-from dotenv import load_dotenv
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from .cache import ResponseCache, prompt_key
+from .hub import IncidentHub
+from .llm import CircuitOpen, LLMGateway
+from .metrics import METRICS_ENABLED, PERSISTENCE_LATENCY, Gauge, MetricsMiddleware, render
+from .profiler import PROFILE_ENABLED, PROFILE_ON_START, SamplingProfiler
+from .storage import IncidentJournal
+from .store import IncidentStore
 
 # === CONFIGURAÇÃO ===
-load_dotenv()
+# .env só existe em desenvolvimento; em produção as variáveis já vêm do
+# ambiente e o python-dotenv nem chega a ser importado
+ENV_FILE = Path(__file__).resolve().parent / ".env"
+if ENV_FILE.exists():
+    from dotenv import load_dotenv
+    load_dotenv(ENV_FILE)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-# Configura IA (Gemini)
-HAS_GENAI = False
-client = None
-if GEMINI_API_KEY:
-    try:
-        from google import genai
-        client = genai.Client(api_key=GEMINI_API_KEY)
-        HAS_GENAI = True
-    except Exception as e:
-        print(f"Erro ao configurar Gemini: {e}")
+def make_gemini_client():
+    # Import pesado (~0.7s): roda na primeira chamada à IA, não no cold start
+    from google import genai
+    # GEMINI_BASE_URL permite apontar para um stub local (benchmarks)
+    base_url = os.getenv("GEMINI_BASE_URL")
+    http_options = genai.types.HttpOptions(base_url=base_url) if base_url else None
+    return genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
 
-app = FastAPI(title="SentinelOneOps Omniscience")
+# Configura IA (Gemini): o cliente é criado sob demanda pelo gateway
+LLM = LLMGateway(make_gemini_client) if GEMINI_API_KEY else None
+HAS_GENAI = LLM is not None
+
+@asynccontextmanager
+async def lifespan(app):
+    # O hub publica a partir de outras threads (WAL); precisa conhecer o loop
+    HUB.bind(asyncio.get_running_loop())
+    # Cold start: WAL + incidentes mais recentes antes de aceitar tráfego;
+    # o resto do histórico chega em background
+    history = load_data()
+    JOURNAL.start()
+    loader = None
+    if history is not None:
+        loader = threading.Thread(target=load_history, args=(history,),
+                                  name="history-loader", daemon=True)
+        loader.start()
+    # PROFILE_ON_START só vale junto com PROFILE_ENABLED=1 (como a rota admin)
+    if PROFILE_ENABLED and PROFILE_ON_START > 0:
+        PROFILER.start(PROFILE_ON_START)
+    yield
+    if loader is not None:
+        HISTORY_STOP.set()
+        await asyncio.to_thread(loader.join)
+    # Drena o WAL e compacta num snapshot limpo ao desligar (só com o histórico completo)
+    JOURNAL.close()
+
+app = FastAPI(title="SentinelOneOps Omniscience", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Incidents-Seq"],
 )
+if METRICS_ENABLED:
+    # Por fora do CORS: mede o tempo total que o cliente vê
+    app.add_middleware(MetricsMiddleware)
 
 # === PERSISTÊNCIA ===
 BASE_DIR = Path(__file__).resolve().parent
-DATA_FILE = BASE_DIR / "data.json"
+DATA_DIR = Path(os.getenv("DATA_DIR", BASE_DIR))
+DATA_FILE = DATA_DIR / "data.json"
+
+# Snapshot em data.json + WAL append-only (data.wal.*) com group commit
+JOURNAL = IncidentJournal(DATA_FILE, snapshot_fn=lambda: INCIDENTS.all())
+HISTORY_BATCH = int(os.getenv("HISTORY_BATCH", "5000"))
+HISTORY_STOP = threading.Event()
 
 def load_data():
-    if not DATA_FILE.exists(): return []
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        try: return json.load(f)
-        except json.JSONDecodeError: return []
+    """
+    Snapshot + replay do WAL (tolerante a crash no meio de uma escrita), em
+    modo incremental: aplica o WAL e o lote mais recente do snapshot e devolve
+    um gerador com o restante do histórico (mais novo -> mais antigo), ou None
+    se já carregou tudo.
+    """
+    global NEXT_ID
+    with PERSISTENCE_LATENCY.time("load"):
+        INCIDENTS.start_loading()
+        # Compactar com o histórico pela metade apagaria o resto do snapshot
+        JOURNAL.compaction_paused = True
+        history = JOURNAL.replay_stream(INCIDENTS.apply, batch_size=HISTORY_BATCH)
+        INCIDENTS.load_older(next(history, []))
+        if "next_id" not in JOURNAL.meta:
+            # Snapshot legado sem next_id: achar o id livre exige ver tudo. Só
+            # acontece uma vez; a próxima compactação grava o meta.
+            load_history(history)
+            history = None
+            JOURNAL.meta["next_id"] = first_free_id(INCIDENTS.all())
+        # A carga não entra no changelog (o "reload" de uma carga legada já está no seq do WAL)
+        INCIDENTS.reset_changelog(JOURNAL.seq)
+    NEXT_ID = JOURNAL.meta["next_id"]
+    return history
+
+def load_history(history):
+    """Carrega o restante do histórico e libera a compactação quando termina."""
+    try:
+        for batch in history:
+            # Um clear durante a carga descarta o resto do histórico
+            if HISTORY_STOP.is_set() or not INCIDENTS.loading:
+                break
+            INCIDENTS.load_older(batch)
+    except Exception as e:
+        # Compactação segue pausada: o snapshot no disco continua sendo a fonte
+        print(f"Erro ao carregar o histórico: {e}")
+        return
+    finally:
+        history.close()
+    if HISTORY_STOP.is_set():
+        # Shutdown no meio da carga: sem compactar, snapshot antigo + WAL continuam valendo
+        return
+    with JOURNAL.lock:
+        if INCIDENTS.finish_loading():
+            # Quem carregou a lista parcial recarrega do zero. O "reload" também
+            # vai para o WAL (no replay é no-op) para o seq do store seguir igual
+            # ao do WAL: sem isso, após um restart o mesmo seq/ETag seria reusado.
+            event = {"seq": INCIDENTS.seq, "reset": True, "upserts": [], "deletes": [],
+                     "stats": INCIDENTS.stats()}
+            # Publica mesmo com o WAL em falha: o reset em memória já aconteceu
+            JOURNAL.append({"op": "reload"}).add_done_callback(lambda _: HUB.publish(event))
+        if not INCIDENTS.loading:
+            JOURNAL.compaction_paused = False
 
-def save_data(data):
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, default=str)
+# Store indexado: id -> incidente, índices por severity/service/acknowledged.
+# Preenchido no lifespan (load_data), não no import.
+INCIDENTS = IncidentStore()
 
-INCIDENTS = load_data()
+# Fan-out para /api/incidents/stream (WebSocket/SSE)
+HUB = IncidentHub()
+STREAM_HEARTBEAT = 15
 
 # === DADOS MOCKADOS ===
 INVENTORY_MOCK = [
@@ -84,109 +185,416 @@ def generate_deep_context(service_name):
 
 # === ROTAS ===
 @app.get("/api/health")
-def health(): return {"status": "ok", "mode": "omniscience"}
+def health():
+    if JOURNAL.failed is not None:
+        # Fail-stop do WAL: memória e disco divergem, o orquestrador deve reiniciar
+        return JSONResponse({"status": "error", "detail": "WAL indisponível"}, status_code=503)
+    return {"status": "ok", "mode": "omniscience", "history_loaded": not INCIDENTS.loading}
+
+def incidents_etag(seq, history_batches, request):
+    # A resposta é determinística dado (seq do store, lotes de histórico, query
+    # string): ETag forte. No cold start a carga muda páginas sem mudar o seq.
+    query = str(request.query_params).encode("utf-8")
+    return f'"{seq}-{history_batches}-{zlib.crc32(query):08x}"'
+
+def etag_matches(request, etag):
+    header = request.headers.get("if-none-match", "")
+    return etag in (tag.strip() for tag in header.split(","))
 
 @app.get("/api/incidents")
-def list_incidents(): return INCIDENTS
+def list_incidents(
+    request: Request,
+    severity: Optional[str] = None,
+    service: Optional[str] = None,
+    acknowledged: Optional[bool] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[int] = None,
+    since: Optional[int] = None,
+):
+    # Poll sem mudanças: 304 sem corpo, sem tocar nos índices
+    etag = incidents_etag(INCIDENTS.seq, INCIDENTS.history_batches, request)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
 
-@app.post("/api/incidents")
-def create_incident(data: dict):
-    new_id = f"INC-{1000 + len(INCIDENTS)}"
-    # Agora salvamos um "contexto secreto" no incidente que só a IA vê
-    deep_log = generate_deep_context(data.get("service"))
-    
-    inc = {
-        "id": new_id,
-        "severity": data.get("severity", "info"),
-        "service": data.get("service", "unknown"),
-        "summary": data.get("summary", "Sem descrição"),
-        "deep_log": deep_log, # <--- O Segredo
-        "opened_at": datetime.now().isoformat(),
-        "acknowledged": False
+    with INCIDENTS.lock:
+        seq, history_batches = INCIDENTS.seq, INCIDENTS.history_batches
+        if since is not None:
+            # Modo delta: só o que mudou depois de `since` (+ contadores)
+            body = INCIDENTS.changes_since(since)
+            body["stats"] = INCIDENTS.stats()
+            next_cursor = None
+        else:
+            # Página mais recente primeiro; a próxima página vem no header X-Next-Cursor
+            body, next_cursor = INCIDENTS.query(
+                limit=limit, cursor=cursor,
+                severity=severity, service=service, acknowledged=acknowledged,
+            )
+
+    headers = {
+        "ETag": incidents_etag(seq, history_batches, request),
+        "Cache-Control": "no-cache",
+        "X-Incidents-Seq": str(seq),
     }
-    INCIDENTS.insert(0, inc)
-    save_data(INCIDENTS)
-    return inc
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+    # JSONResponse direto: os itens já são dicts serializáveis, pula o jsonable_encoder
+    return JSONResponse(body, headers=headers)
+
+@app.get("/api/incidents/stats")
+def incident_stats(): return INCIDENTS.stats()
+
+# Validação compilada (pydantic-core): item avulso, array JSON e linhas NDJSON
+class IncidentIn(BaseModel):
+    severity: str = "info"
+    service: str = "unknown"
+    summary: str = "Sem descrição"
+
+INCIDENT_LIST = TypeAdapter(List[IncidentIn])
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+BATCH_MAX = int(os.getenv("BATCH_MAX", "10000"))
+
+def first_free_id(incidents):
+    numbers = [int(i["id"][4:]) for i in incidents if i["id"].startswith("INC-") and i["id"][4:].isdigit()]
+    return max(numbers, default=999) + 1
+
+# Próximo número de id: persistido no WAL/snapshot (meta), nunca reaproveitado
+# depois de um DELETE — o antigo 1000 + len(INCIDENTS) colidia. Definido no load_data.
+NEXT_ID = None
+
+def ensure_writable():
+    # Depois de uma falha no WAL nada mais entra na memória (chame com JOURNAL.lock)
+    if JOURNAL.failed is not None:
+        raise HTTPException(status_code=503, detail="Persistência indisponível")
+
+def wait_durable(durable):
+    try:
+        return durable.result()
+    except Exception:
+        raise HTTPException(status_code=503, detail="Falha ao gravar no WAL")
+
+def insert_incidents(items):
+    """Insere um lote com um único registro no WAL (um fsync) e um único evento."""
+    global NEXT_ID
+    if not items:
+        return []
+    opened_at = datetime.now().isoformat()
+    incs = [
+        {
+            "id": None,
+            "severity": item.severity,
+            "service": item.service,
+            "summary": item.summary,
+            # Agora salvamos um "contexto secreto" no incidente que só a IA vê
+            "deep_log": generate_deep_context(item.service), # <--- O Segredo
+            "opened_at": opened_at,
+            "acknowledged": False,
+        }
+        for item in items
+    ]
+    with JOURNAL.lock:
+        ensure_writable()
+        # Ids alocados em bloco sob a trava: POSTs concorrentes não colidem
+        for offset, inc in enumerate(incs):
+            inc["id"] = f"INC-{NEXT_ID + offset}"
+            INCIDENTS.put(inc)
+        NEXT_ID += len(incs)
+        event = {"seq": INCIDENTS.seq, "reset": False, "upserts": incs[::-1], "deletes": [],
+                 "stats": INCIDENTS.stats()}
+        if len(incs) == 1:
+            op = {"op": "put", "incident": incs[0]}
+        else:
+            op = {"op": "put_many", "incidents": incs}
+        op["meta"] = {"next_id": NEXT_ID}
+        # Publica só depois do fsync, na ordem do WAL
+        durable = JOURNAL.append(op, on_durable=lambda _: HUB.publish(event), count=len(incs))
+    wait_durable(durable)
+    return incs
+
+@app.post("/api/incidents")
+def create_incident(data: IncidentIn):
+    return insert_incidents([data])[0]
+
+def batch_error(errors, line=None):
+    # errors() sem "input": em json_invalid ele vem em bytes e quebraria o JSONResponse
+    detail = errors if line is None else [dict(e, loc=["line", line, *e["loc"]]) for e in errors]
+    return HTTPException(status_code=422, detail=detail)
+
+def batch_too_large():
+    return HTTPException(status_code=413, detail=f"Lote acima de {BATCH_MAX} incidentes")
+
+async def read_ndjson(request):
+    # Valida linha a linha conforme o corpo chega, sem montar o corpo inteiro
+    items, buffer, line_no = [], b"", 0
+
+    def take(line):
+        nonlocal line_no
+        line_no += 1
+        if not line.strip():
+            return
+        try:
+            items.append(IncidentIn.model_validate_json(line))
+        except ValidationError as e:
+            raise batch_error(e.errors(include_url=False, include_context=False, include_input=False), line_no)
+        if len(items) > BATCH_MAX:
+            raise batch_too_large()
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            take(line)
+    take(buffer)
+    return items
+
+@app.post("/api/incidents:batch")
+async def create_incidents_batch(request: Request):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in NDJSON_TYPES:
+        items = await read_ndjson(request)
+    else:
+        try:
+            items = INCIDENT_LIST.validate_json(await request.body())
+        except ValidationError as e:
+            raise batch_error(e.errors(include_url=False, include_context=False, include_input=False))
+        if len(items) > BATCH_MAX:
+            raise batch_too_large()
+
+    # A trava e o fsync ficam fora do event loop
+    incs = await run_in_threadpool(insert_incidents, items)
+    return JSONResponse({"inserted": len(incs), "ids": [inc["id"] for inc in incs]})
 
 @app.delete("/api/incidents")
 def clear_all_incidents():
-    INCIDENTS.clear()
-    save_data(INCIDENTS)
+    with JOURNAL.lock:
+        ensure_writable()
+        INCIDENTS.clear()
+        event = {"seq": INCIDENTS.seq, "reset": True, "upserts": [], "deletes": [],
+                 "stats": INCIDENTS.stats()}
+        durable = JOURNAL.append({"op": "clear"}, on_durable=lambda _: HUB.publish(event))
+    wait_durable(durable)
     return {"status": "success"}
 
+# === SSE ===
+def sse_event(payload, event=None):
+    data = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {data}\n\n"
+
+async def sse_single(html):
+    # Resposta pronta (mock/offline) no mesmo formato do streaming
+    yield sse_event({"delta": html})
+    yield sse_event({}, event="done")
+
+def sse_response(events):
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# === STREAM DE INCIDENTES (PUSH) ===
+def stream_snapshot(since):
+    """Primeira mensagem do stream: delta desde `since` (ou reset se não veio)."""
+    with INCIDENTS.lock:
+        delta = INCIDENTS.changes_since(since if since is not None else -1)
+        delta["stats"] = INCIDENTS.stats()
+    return json.dumps(delta, default=str)
+
+@app.websocket("/api/incidents/stream")
+async def incidents_stream_ws(websocket: WebSocket, since: Optional[int] = None):
+    await websocket.accept()
+    sub = HUB.subscribe()
+    try:
+        await websocket.send_text(await run_in_threadpool(stream_snapshot, since))
+        while True:
+            message = await sub.get(STREAM_HEARTBEAT)
+            await websocket.send_text(message if message is not None else '{"ping": true}')
+    except (WebSocketDisconnect, RuntimeError, OSError):
+        pass
+    finally:
+        HUB.unsubscribe(sub)
+
+@app.get("/api/incidents/stream")
+async def incidents_stream_sse(request: Request, since: Optional[int] = None):
+    # Fallback SSE (EventSource): mesmo conteúdo do WebSocket
+    async def events():
+        sub = HUB.subscribe()
+        try:
+            yield sse_event(await run_in_threadpool(stream_snapshot, since))
+            while True:
+                message = await sub.get(STREAM_HEARTBEAT)
+                yield ": ping\n\n" if message is None else sse_event(message)
+        finally:
+            HUB.unsubscribe(sub)
+
+    return sse_response(events())
+
 @app.get("/api/inventory")
 def list_inventory(): return INVENTORY_MOCK
 
 # === ORÁCULO DO CAOS (PREDIÇÃO FUTURA) ===
-@app.get("/api/oracle")
-def chaos_oracle():
-    target = random.choice(INVENTORY_MOCK)
-    mock_chaos = f"""
+def oracle_mock(target):
+    return f"""
     <h3>🔮 Visão da Entropia</h3>
     <p>O ativo <b>{target['name']}</b> apresenta vibrações quânticas instáveis.</p>
     """
 
-    if HAS_GENAI and client:
-        prompt = f"""
-        Você é uma IA Onisciente de Infraestrutura (The Core).
-        Você vê o futuro. Analise este ativo: {target['name']} ({target['type']}).
-        
-        Gere uma profecia técnica catastrófica detalhada.
-        Exemplo: "Em 4 horas, o Garbage Collector vai travar devido a um vazamento de memória na lib xpto v2.4".
-        
-        Use HTML. Seja sombrio, preciso e "Deus Ex Machina".
-        """
+def build_oracle_prompt(target):
+    return f"""
+    Você é uma IA Onisciente de Infraestrutura (The Core).
+    Você vê o futuro. Analise este ativo: {target['name']} ({target['type']}).
+    
+    Gere uma profecia técnica catastrófica detalhada.
+    Exemplo: "Em 4 horas, o Garbage Collector vai travar devido a um vazamento de memória na lib xpto v2.4".
+    
+    Use HTML. Seja sombrio, preciso e "Deus Ex Machina".
+    """
+
+@app.get("/api/oracle")
+async def chaos_oracle():
+    target = random.choice(INVENTORY_MOCK)
+    mock_chaos = oracle_mock(target)
+
+    if HAS_GENAI and LLM:
+        prompt = build_oracle_prompt(target)
         try:
-            response = client.models.generate_content(model="gemini-1.5-flash", contents=prompt)
-            return {"prediction": response.text}
+            return {"prediction": await LLM.generate(prompt)}
         except Exception: return {"prediction": mock_chaos}
     return {"prediction": mock_chaos}
 
+@app.get("/api/oracle/stream")
+async def chaos_oracle_stream():
+    target = random.choice(INVENTORY_MOCK)
+    if not (HAS_GENAI and LLM):
+        return sse_response(sse_single(oracle_mock(target)))
+
+    async def events():
+        sent = False
+        try:
+            async for text in LLM.stream(build_oracle_prompt(target)):
+                sent = True
+                yield sse_event({"delta": text})
+        except Exception:
+            # Mesmo fallback da rota não-streaming (só se nada foi enviado ainda)
+            if not sent:
+                yield sse_event({"delta": oracle_mock(target)})
+        yield sse_event({}, event="done")
+
+    return sse_response(events())
+
 # === IA ONISCIENTE (ANÁLISE DO PASSADO/PRESENTE) ===
-@app.get("/api/incidents/{inc_id}/explain")
-def explain_incident(inc_id: str):
-    inc = next((i for i in INCIDENTS if i["id"] == inc_id), None)
-    if not inc: raise HTTPException(status_code=404, detail="Incidente não encontrado")
+EXPLAIN_OFFLINE = "<p>IA Offline. O Oráculo dorme.</p>"
+EXPLAIN_CACHE = ResponseCache()
 
+def build_explain_prompt(inc):
     # Recupera o log técnico gerado na criação
     deep_log = inc.get("deep_log", "Log data corrupted.")
 
-    if HAS_GENAI and client:
-        # O PROMPT SUPREMO
-        prompt = f"""
-        ATUE COMO: "The Overseer" (Uma IA SRE nível Deus).
-        
-        ANALISE ESTE INCIDENTE COM ACESSO TOTAL AOS DADOS:
-        ID: {inc['id']}
-        Serviço: {inc['service']}
-        Resumo Humano: {inc['summary']}
-        LOG DO KERNEL/SISTEMA (CONTEXTO REAL): "{deep_log}"
-        
-        SUA MISSÃO:
-        1. Identifique a Causa Raiz baseada no LOG TÉCNICO acima (invente os detalhes faltantes para parecer real).
-        2. Estime o Impacto Financeiro/Operacional.
-        3. Gere o CÓDIGO EXATO (Bash, SQL ou Python) para corrigir o problema agora.
-        
-        FORMATO DE RESPOSTA (HTML APENAS):
-        <div style="border-left: 3px solid #00fff2; padding-left: 15px;">
-            <h3>👁️ Análise Onisciente</h3>
-            <p><b>Causa Raiz Detectada:</b> [Explicação técnica baseada no log]</p>
-            <p><b>Probabilidade de Recorrência:</b> [Porcentagem]%</p>
-        </div>
-        <br>
-        <div style="background: rgba(0,0,0,0.3); padding: 10px; border-radius: 6px;">
-            <p style="color: #ff2a6d; margin:0;"><b>⚠️ Protocolo de Correção Imediata:</b></p>
-            <pre style="color: #b9ff4a; font-family: monospace;">[Insira o código de correção aqui]</pre>
-        </div>
-        <p><i>"Observação Filosófica sobre o erro."</i></p>
-        """
+    # O PROMPT SUPREMO
+    prompt = f"""
+    ATUE COMO: "The Overseer" (Uma IA SRE nível Deus).
+    
+    ANALISE ESTE INCIDENTE COM ACESSO TOTAL AOS DADOS:
+    ID: {inc['id']}
+    Serviço: {inc['service']}
+    Resumo Humano: {inc['summary']}
+    LOG DO KERNEL/SISTEMA (CONTEXTO REAL): "{deep_log}"
+    
+    SUA MISSÃO:
+    1. Identifique a Causa Raiz baseada no LOG TÉCNICO acima (invente os detalhes faltantes para parecer real).
+    2. Estime o Impacto Financeiro/Operacional.
+    3. Gere o CÓDIGO EXATO (Bash, SQL ou Python) para corrigir o problema agora.
+    
+    FORMATO DE RESPOSTA (HTML APENAS):
+    <div style="border-left: 3px solid #00fff2; padding-left: 15px;">
+        <h3>👁️ Análise Onisciente</h3>
+        <p><b>Causa Raiz Detectada:</b> [Explicação técnica baseada no log]</p>
+        <p><b>Probabilidade de Recorrência:</b> [Porcentagem]%</p>
+    </div>
+    <br>
+    <div style="background: rgba(0,0,0,0.3); padding: 10px; border-radius: 6px;">
+        <p style="color: #ff2a6d; margin:0;"><b>⚠️ Protocolo de Correção Imediata:</b></p>
+        <pre style="color: #b9ff4a; font-family: monospace;">[Insira o código de correção aqui]</pre>
+    </div>
+    <p><i>"Observação Filosófica sobre o erro."</i></p>
+    """
+    return prompt
+
+@app.get("/api/incidents/{inc_id}/explain")
+async def explain_incident(inc_id: str):
+    inc = INCIDENTS.get(inc_id)
+    if not inc: raise HTTPException(status_code=404, detail="Incidente não encontrado")
+
+    if HAS_GENAI and LLM:
+        prompt = build_explain_prompt(inc)
         try:
-            response = client.models.generate_content(model="gemini-1.5-flash", contents=prompt)
-            return {"explanation": response.text}
+            # O prompt só depende do incidente: pedidos iguais dividem a mesma geração
+            key = prompt_key(LLM.model, prompt)
+            text = await EXPLAIN_CACHE.get_or_compute(key, lambda: LLM.generate(prompt))
+            return {"explanation": text}
+        except CircuitOpen:
+            # Provedor degradado: responde na hora com o mock em vez de enfileirar
+            return {"explanation": EXPLAIN_OFFLINE}
         except Exception as e:
             return {"explanation": f"<p>Erro na conexão neural: {e}</p>"}
     
-    return {"explanation": "<p>IA Offline. O Oráculo dorme.</p>"}
+    return {"explanation": EXPLAIN_OFFLINE}
+
+@app.get("/api/incidents/{inc_id}/explain/stream")
+async def explain_incident_stream(inc_id: str):
+    # Variante SSE: o HTML chega aos pedaços, o primeiro byte sai no primeiro token
+    inc = INCIDENTS.get(inc_id)
+    if not inc: raise HTTPException(status_code=404, detail="Incidente não encontrado")
+    if not (HAS_GENAI and LLM):
+        return sse_response(sse_single(EXPLAIN_OFFLINE))
+
+    prompt = build_explain_prompt(inc)
+    key = prompt_key(LLM.model, prompt)
+
+    async def events():
+        try:
+            # Single-flight também no streaming: dashboards abrindo o mesmo incidente
+            # dividem uma geração. Se todos desconectarem, o cache cancela a geração
+            # e o LLM.stream fecha o stream do provedor (sem gastar mais tokens)
+            async with aclosing(EXPLAIN_CACHE.stream(key, lambda: LLM.stream(prompt))) as chunks:
+                async for text in chunks:
+                    yield sse_event({"delta": text})
+        except CircuitOpen:
+            yield sse_event({"delta": EXPLAIN_OFFLINE})
+        except Exception as e:
+            yield sse_event({"delta": f"<p>Erro na conexão neural: {e}</p>"})
+        yield sse_event({}, event="done")
+
+    return sse_response(events())
+
+@app.get("/api/ai/cache")
+def explain_cache_stats(): return EXPLAIN_CACHE.stats()
+
+# === OBSERVABILIDADE ===
+# Valores lidos na hora do scrape, sem custo no caminho quente
+Gauge("sentinel_incidents", "Incidentes no store.", fn=lambda: len(INCIDENTS))
+Gauge("sentinel_incidents_seq", "Seq atual do store (mudanças aplicadas).", fn=lambda: INCIDENTS.seq)
+Gauge("sentinel_stream_subscribers", "Assinantes conectados ao stream.", fn=lambda: len(HUB.subscribers))
+Gauge("sentinel_llm_circuit_open", "1 se o circuit breaker do LLM está aberto.",
+      fn=lambda: int(LLM is not None and LLM.breaker.state == "open"))
+Gauge("sentinel_explain_cache_events_total", "Eventos do cache de explicações.", ("event",),
+      kind="counter",
+      fn=lambda: {(k,): v for k, v in EXPLAIN_CACHE.counters.items()})
+Gauge("sentinel_explain_cache_entries", "Entradas do cache de explicações em memória.",
+      fn=lambda: len(EXPLAIN_CACHE.memory))
+
+@app.get("/api/metrics")
+def metrics():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+PROFILER = SamplingProfiler()
+
+@app.post("/api/admin/profile")
+def start_profile(seconds: float = Query(10, gt=0, le=300)):
+    # Opt-in: com PROFILE_ENABLED=1 grava um flamegraph (collapsed stacks) da janela
+    if not PROFILE_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler desabilitado (PROFILE_ENABLED=1)")
+    path = PROFILER.start(seconds)
+    if path is None:
+        raise HTTPException(status_code=409, detail="Já existe um profile em andamento")
+    return {"status": "running", "seconds": seconds, "output": str(path)}
 
 # === SETUP ===
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
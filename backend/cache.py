@@ -0,0 +1,253 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from cachetools import TTLCache
+
+# === CACHE DE RESPOSTAS DA IA ===
+# Chave = sha256 do prompt renderizado (content-addressed): o mesmo incidente
+# gera o mesmo prompt, então dashboards diferentes reaproveitam a mesma análise.
+#   1. memória: TTLCache (LRU + TTL)
+#   2. disco (opcional): um arquivo JSON por chave, sobrevive a reinícios.
+#      mtime = último acesso; a varredura apaga o que passou do TTL e, acima de
+#      EXPLAIN_CACHE_DISK_MAX arquivos, os menos usados (a cada DISK_SWEEP_EVERY gravações)
+#   3. single-flight: pedidos idênticos simultâneos esperam a mesma chamada
+#      (no streaming, quem chega depois recebe os pedaços já gerados e segue junto)
+
+EXPLAIN_CACHE_SIZE = int(os.getenv("EXPLAIN_CACHE_SIZE", "1024"))
+EXPLAIN_CACHE_TTL = float(os.getenv("EXPLAIN_CACHE_TTL", "3600"))
+EXPLAIN_CACHE_DIR = os.getenv("EXPLAIN_CACHE_DIR")
+EXPLAIN_CACHE_DISK_MAX = int(os.getenv("EXPLAIN_CACHE_DISK_MAX", "10000"))
+DISK_SWEEP_EVERY = 100
+
+
+def prompt_key(model, prompt):
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """Geração em streaming em andamento: pedaços já recebidos e quantos ouvem."""
+
+    def __init__(self):
+        self.chunks = []
+        self.listeners = 0
+        self.changed = asyncio.Event()
+
+    def push(self, chunk=None):
+        if chunk is not None:
+            self.chunks.append(chunk)
+        # Evento novo a cada mudança: quem já esperava acorda, quem chegar espera o próximo
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class ResponseCache:
+    def __init__(self, maxsize=EXPLAIN_CACHE_SIZE, ttl=EXPLAIN_CACHE_TTL, disk_dir=EXPLAIN_CACHE_DIR,
+                 disk_max=EXPLAIN_CACHE_DISK_MAX):
+        self.ttl = ttl
+        self.disk_max = disk_max
+        self._disk_puts = 0
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._inflight = {}
+        self._flights = {}
+        self.counters = {"hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0}
+
+    # --- Disco ---
+    def _disk_path(self, key):
+        return self.disk_dir / f"{key}.json"
+
+    def _disk_get(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except OSError:
+            return None
+        except ValueError:
+            path.unlink(missing_ok=True)
+            return None
+        if time.time() - entry.get("created", 0) > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            # Acesso renova o mtime: a varredura despeja os menos usados (LRU)
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("text")
+
+    def _disk_put(self, key, text):
+        path = self._disk_path(key)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "text": text}, f)
+        os.replace(tmp, path)
+        # Varre na primeira gravação e depois a cada DISK_SWEEP_EVERY
+        if self._disk_puts % DISK_SWEEP_EVERY == 0:
+            self._disk_sweep()
+        self._disk_puts += 1
+
+    def _disk_sweep(self):
+        """Apaga entradas vencidas (mtime > TTL) e, acima de disk_max, as de acesso mais antigo."""
+        entries = []
+        for path in self.disk_dir.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        # created <= mtime: sem acesso há mais de um TTL, com certeza venceu
+        cutoff = time.time() - self.ttl
+        alive = []
+        for mtime, path in entries:
+            if mtime < cutoff:
+                path.unlink(missing_ok=True)
+            else:
+                alive.append((mtime, path))
+        if len(alive) > self.disk_max:
+            alive.sort()
+            for _, path in alive[:len(alive) - self.disk_max]:
+                path.unlink(missing_ok=True)
+
+    # --- API ---
+    async def lookup(self, key):
+        """Memória, depois disco. Devolve o texto ou None."""
+        text = self.memory.get(key)
+        if text is not None:
+            self.counters["hits"] += 1
+            return text
+        if self.disk_dir:
+            text = await asyncio.to_thread(self._disk_get, key)
+            if text is not None:
+                self.counters["disk_hits"] += 1
+                self.memory[key] = text
+                return text
+        return None
+
+    async def store(self, key, text):
+        self.memory[key] = text
+        if self.disk_dir:
+            try:
+                await asyncio.to_thread(self._disk_put, key, text)
+            except OSError as e:
+                print(f"Erro ao gravar cache em disco: {e}")
+
+    async def get_or_compute(self, key, compute):
+        """
+        Devolve o texto em cache ou chama `compute()` (coroutine) uma única vez
+        por chave, mesmo com vários pedidos simultâneos. Erros não são cacheados.
+        """
+        text = await self.lookup(key)
+        if text is not None:
+            return text
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.counters["coalesced"] += 1
+            return await self._wait(key, pending)
+
+        self.counters["misses"] += 1
+        pending = self._start(key, self._compute(key, compute))
+        # shield: se este pedido for cancelado, a chamada compartilhada segue
+        return await asyncio.shield(pending)
+
+    async def stream(self, key, produce):
+        """
+        Versão streaming do get_or_compute: `produce()` devolve um gerador
+        assíncrono de pedaços. Em cache, o texto sai inteiro. Com um stream da
+        mesma chave em andamento, quem chega recebe os pedaços já gerados e segue
+        junto; com uma geração não-stream em andamento, espera o texto inteiro.
+        Se todos os ouvintes desistirem, a geração é cancelada.
+        """
+        text = await self.lookup(key)
+        if text is not None:
+            yield text
+            return
+
+        pending = self._inflight.get(key)
+        if pending is None:
+            self.counters["misses"] += 1
+            flight = self._flights[key] = _Flight()
+            pending = self._start(key, self._pump(key, produce, flight))
+            # Acorda os ouvintes também no fim (sucesso, erro ou cancelamento)
+            pending.add_done_callback(lambda _: flight.push())
+        else:
+            self.counters["coalesced"] += 1
+            flight = self._flights.get(key)
+            if flight is None:
+                yield await self._wait(key, pending)
+                return
+
+        flight.listeners += 1
+        try:
+            sent = 0
+            while True:
+                while sent < len(flight.chunks):
+                    sent += 1
+                    yield flight.chunks[sent - 1]
+                if pending.done():
+                    break
+                await flight.changed.wait()
+            # Propaga o erro da geração (depois dos pedaços que chegaram)
+            pending.result()
+        finally:
+            self._leave(key, flight, pending)
+
+    # --- Single-flight ---
+    def _start(self, key, coro):
+        pending = asyncio.ensure_future(coro)
+        # Marca a exceção como lida caso todos os pedidos tenham sido cancelados
+        pending.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[key] = pending
+        return pending
+
+    async def _wait(self, key, pending):
+        flight = self._flights.get(key)
+        if flight is None:
+            return await asyncio.shield(pending)
+        # Quem espera um stream também conta como ouvinte (não deixa cancelar)
+        flight.listeners += 1
+        try:
+            return await asyncio.shield(pending)
+        finally:
+            self._leave(key, flight, pending)
+
+    def _leave(self, key, flight, pending):
+        flight.listeners -= 1
+        if flight.listeners == 0 and not pending.done():
+            # Ninguém mais ouvindo: para de gastar tokens. Sai do mapa já, para
+            # quem chegar agora começar uma geração nova em vez de herdar o cancelamento
+            pending.cancel()
+            self._forget(key, pending)
+
+    def _forget(self, key, pending):
+        if self._inflight.get(key) is pending:
+            del self._inflight[key]
+            self._flights.pop(key, None)
+
+    async def _compute(self, key, compute):
+        try:
+            text = await compute()
+            await self.store(key, text)
+            return text
+        finally:
+            self._forget(key, asyncio.current_task())
+
+    async def _pump(self, key, produce, flight):
+        try:
+            async for chunk in produce():
+                flight.push(chunk)
+            text = "".join(flight.chunks)
+            # Só uma geração completa vai para o cache
+            await self.store(key, text)
+            return text
+        finally:
+            self._forget(key, asyncio.current_task())
+
+    def stats(self):
+        return dict(self.counters, size=len(self.memory), inflight=len(self._inflight))
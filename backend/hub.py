@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+# === HUB DE PUB/SUB (FAN-OUT) ===
+# Eventos têm o mesmo formato do delta de GET /api/incidents?since=<seq>:
+#   {"seq", "reset", "upserts", "deletes", "stats"}
+# Cada evento é serializado uma única vez e a mesma string vai para todos os
+# assinantes. Cada assinante tem uma fila limitada; se ela enche (cliente lento),
+# a fila é descartada e substituída por um evento de resync.
+
+RESYNC = json.dumps({"reset": True, "upserts": [], "deletes": []})
+
+
+class Subscription:
+    def __init__(self, maxsize):
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def offer(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Backpressure: em vez de crescer sem limite, joga fora o atraso
+            # e pede para o cliente recarregar o estado.
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self, timeout):
+        """Próxima mensagem, ou None se nada chegar dentro de `timeout` (heartbeat)."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class IncidentHub:
+    def __init__(self, queue_size=256):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.loop = None
+
+    def bind(self, loop):
+        """Associa o hub ao event loop do servidor (chamado no startup)."""
+        self.loop = loop
+
+    def subscribe(self):
+        sub = Subscription(self.queue_size)
+        self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        self.subscribers.discard(sub)
+
+    def publish(self, event):
+        """Thread-safe: pode ser chamado das threads do threadpool ou do WAL."""
+        if self.loop is None or not self.subscribers:
+            return
+        message = json.dumps(event, default=str)
+        self.loop.call_soon_threadsafe(self._fanout, message)
+
+    def _fanout(self, message):
+        for sub in list(self.subscribers):
+            sub.offer(message)
@@ -0,0 +1,204 @@
+import asyncio
+import os
+import sys
+import time
+
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception,
+    stop_after_attempt,
+    stop_after_delay,
+    wait_random_exponential,
+)
+
+from .metrics import LLM_ERRORS, LLM_LATENCY
+
+# === GATEWAY DA IA (GEMINI ASSÍNCRONO) ===
+# Toda chamada ao LLM passa por aqui:
+#   - semáforo global: no máximo LLM_CONCURRENCY gerações em voo
+#   - deadline por tentativa (LLM_TIMEOUT) e total (LLM_DEADLINE)
+#   - retry com backoff exponencial + jitter (tenacity), só para erros transitórios
+#   - circuit breaker: depois de N falhas seguidas, para de chamar o provedor
+#     por um tempo e as rotas respondem com o HTML mock
+#   - cliente do SDK criado na primeira chamada (fora do cold start)
+
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "45"))
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+
+class CircuitOpen(Exception):
+    """O provedor está degradado; use o fallback local."""
+
+
+def is_transient(exc):
+    """
+    Vale repetir: timeout, falha de conexão, 429 ou 5xx do provedor. Erros 4xx
+    (chave inválida, requisição malformada) falham igual na próxima tentativa.
+    """
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    # Pelo sys.modules, sem importar: httpx e o SDK só carregam com o cliente
+    httpx = sys.modules.get("httpx")
+    if httpx is not None and isinstance(exc, httpx.TransportError):
+        return True
+    errors = sys.modules.get("google.genai.errors")
+    if errors is not None and isinstance(exc, errors.APIError):
+        return exc.code == 429 or (exc.code or 0) >= 500
+    return False
+
+
+class CircuitBreaker:
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open":
+            raise CircuitOpen()
+        if state == "half-open":
+            # Só uma chamada de teste por vez enquanto meio-aberto
+            if self._probing:
+                raise CircuitOpen()
+            self._probing = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release(self):
+        """Libera a vaga de teste sem contar sucesso nem falha (ex.: cliente desconectou)."""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class LLMGateway:
+    def __init__(self, client_factory, model="gemini-1.5-flash"):
+        # client_factory() importa o SDK e devolve o cliente; roda uma vez só
+        self.client_factory = client_factory
+        self.client = None
+        self.client_error = None
+        self.model = model
+        self.breaker = CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN)
+        self.semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+        self._client_lock = asyncio.Lock()
+
+    async def _get_client(self):
+        """Cria o cliente na primeira chamada, numa thread (o import é lento)."""
+        if self.client is None:
+            async with self._client_lock:
+                if self.client is None and self.client_error is None:
+                    try:
+                        self.client = await asyncio.to_thread(self.client_factory)
+                    except Exception as e:
+                        print(f"Erro ao configurar Gemini: {e}")
+                        self.client_error = e
+            if self.client is None:
+                # SDK ausente/mal configurado: mesmo fallback do provedor degradado
+                raise CircuitOpen()
+        return self.client
+
+    async def _attempt(self, prompt):
+        client = await self._get_client()
+        # Breaker só conta tentativas que chegaram ao provedor: quem é cancelado
+        # (deadline) ainda na fila do semáforo não diz nada sobre a saúde dele
+        async with self.semaphore:
+            self.breaker.before_call()
+            ok = False
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    client.aio.models.generate_content(model=self.model, contents=prompt),
+                    LLM_TIMEOUT,
+                )
+                ok = True
+            except BaseException as e:
+                LLM_ERRORS.inc("generate", type(e).__name__)
+                raise
+            finally:
+                # finally (e não except) para contar também cancelamento pelo deadline total
+                LLM_LATENCY.observe(time.perf_counter() - start, "generate", "success" if ok else "failure")
+                if ok:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+        return response.text
+
+    async def generate(self, prompt):
+        """Gera texto com retry/jitter. Levanta CircuitOpen se o breaker estiver aberto."""
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(LLM_RETRIES + 1) | stop_after_delay(LLM_DEADLINE),
+            wait=wait_random_exponential(multiplier=0.5, max=4),
+            retry=retry_if_exception(is_transient),
+            reraise=True,
+        )
+        async with asyncio.timeout(LLM_DEADLINE):
+            async for attempt in retrying:
+                with attempt:
+                    return await self._attempt(prompt)
+
+    async def stream(self, prompt):
+        """
+        Gera texto em pedaços (generate_content_stream). Sem retry: depois do
+        primeiro token não dá para recomeçar. LLM_TIMEOUT vale por pedaço.
+        Se o consumidor parar (cliente desconectou), o stream do provedor é fechado.
+        """
+        client = await self._get_client()
+        async with self.semaphore:
+            # Como no _attempt: fila do semáforo não conta para o breaker
+            self.breaker.before_call()
+            outcome = "failure"
+            start = time.perf_counter()
+            try:
+                chunks = await asyncio.wait_for(
+                    client.aio.models.generate_content_stream(model=self.model, contents=prompt),
+                    LLM_TIMEOUT,
+                )
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(anext(chunks), LLM_TIMEOUT)
+                        except StopAsyncIteration:
+                            break
+                        if chunk.text:
+                            yield chunk.text
+                finally:
+                    aclose = getattr(chunks, "aclose", None)
+                    if aclose is not None:
+                        await aclose()
+                outcome = "success"
+            except (asyncio.CancelledError, GeneratorExit):
+                outcome = "cancelled"
+                raise
+            except Exception as e:
+                LLM_ERRORS.inc("stream", type(e).__name__)
+                raise
+            finally:
+                LLM_LATENCY.observe(time.perf_counter() - start, "stream", outcome)
+                if outcome == "success":
+                    self.breaker.record_success()
+                elif outcome == "cancelled":
+                    self.breaker.release()
+                else:
+                    self.breaker.record_failure()
@@ -0,0 +1,215 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# === MÉTRICAS (FORMATO PROMETHEUS) ===
+# Registro mínimo, sem dependência externa: Counter, Gauge e Histogram com
+# labels, expostos em texto pelo GET /api/metrics. Cada observação é um bisect
+# + incremento sob uma trava curta, para caber no orçamento de overhead.
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+REGISTRY = []
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, doc, labels=()):
+        self.name, self.doc, self.labelnames = name, doc, tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            items = list(self.values.items())
+        return [(self.name, _labels(self.labelnames, k), v) for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def __init__(self, name, doc, labels=(), fn=None, kind=None):
+        # fn: valor calculado na hora do scrape (ex.: tamanho do store). Pode
+        # devolver um número ou {labels: valor}; `kind` permite expor contadores
+        # mantidos em outro lugar (ex.: hits do cache) com o tipo certo.
+        super().__init__(name, doc, labels)
+        self.fn = fn
+        if kind:
+            self.kind = kind
+
+    def set(self, *labels, value):
+        with self.lock:
+            self.values[labels] = value
+
+    def samples(self):
+        if self.fn is None:
+            return super().samples()
+        value = self.fn()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        return [(self.name, _labels(self.labelnames, k), v) for k, v in items]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.doc, self.labelnames = name, doc, tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self._new_series(labels)
+            series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def series_for(self, *labels):
+        """Lista de contagens de um conjunto de labels (para quem guarda a série e atualiza sob self.lock)."""
+        with self.lock:
+            return self.series.get(labels) or self._new_series(labels)
+
+    def _new_series(self, labels):
+        # contagens por bucket (não cumulativas) + [soma, total]
+        series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        return series
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self.lock:
+            items = [(k, list(v)) for k, v in self.series.items()]
+        out = []
+        for key, series in items:
+            names = self.labelnames + ("le",)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                out.append((f"{self.name}_bucket", _labels(names, key + (bound,)), cumulative))
+            out.append((f"{self.name}_sum", _labels(self.labelnames, key), series[-2]))
+            out.append((f"{self.name}_count", _labels(self.labelnames, key), series[-1]))
+        return out
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram, self.labels = histogram, labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.doc}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# === MÉTRICAS DO APP ===
+HTTP_LATENCY = Histogram("sentinel_http_request_duration_seconds",
+                         "Latência por rota (template), método e status.",
+                         ("method", "route", "status"))
+# Só o MetricsMiddleware mexe nesses contadores, sempre no event loop: sem trava
+_OPEN = {"http": 0, "sse": 0}
+HTTP_IN_FLIGHT = Gauge("sentinel_http_requests_in_flight", "Requisições em andamento (sem SSE).",
+                       fn=lambda: _OPEN["http"])
+SSE_OPEN = Gauge("sentinel_sse_streams_open", "Respostas text/event-stream abertas.",
+                 fn=lambda: _OPEN["sse"])
+PERSISTENCE_LATENCY = Histogram("sentinel_persistence_duration_seconds",
+                                "Tempo de load do snapshot, commit do WAL e compactação.",
+                                ("op",))
+WAL_RECORDS = Counter("sentinel_wal_records_total", "Registros gravados no WAL.")
+LLM_LATENCY = Histogram("sentinel_llm_call_duration_seconds",
+                        "Duração das chamadas ao LLM por tipo e resultado.",
+                        ("kind", "outcome"), buckets=LLM_BUCKETS)
+LLM_ERRORS = Counter("sentinel_llm_errors_total", "Erros nas chamadas ao LLM por tipo e exceção.",
+                     ("kind", "error"))
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro (sem BaseHTTPMiddleware): latência e requisições em voo."""
+
+    def __init__(self, app):
+        self.app = app
+        # (método, rota, status) -> série do HTTP_LATENCY, montada uma vez por combinação
+        self._series = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        sse = False
+
+        async def send_wrapper(message):
+            nonlocal status, sse
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = message.get("headers")
+                # Corpo de tamanho fixo: o Starlette põe content-length primeiro, e
+                # SSE nunca tem. Só as outras respostas pagam a busca do content-type.
+                if headers and headers[0][0] != b"content-length":
+                    for name, value in headers:
+                        if name == b"content-type":
+                            if value.startswith(b"text/event-stream"):
+                                # Stream de horas: sai do "em voo" e do histograma de latência
+                                sse = True
+                                _OPEN["http"] -= 1
+                                _OPEN["sse"] += 1
+                            break
+            await send(message)
+
+        _OPEN["http"] += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if sse:
+                _OPEN["sse"] -= 1
+            else:
+                _OPEN["http"] -= 1
+                elapsed = time.perf_counter() - start
+                # Template da rota (/api/incidents/{inc_id}/explain), não o path cru
+                route = scope.get("route")
+                label = route.path if route is not None else "static" if "endpoint" in scope else "unmatched"
+                key = (scope["method"], label, status)
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = HTTP_LATENCY.series_for(*key)
+                # Histogram.observe sem o lookup de labels
+                i = bisect_left(HTTP_LATENCY.buckets, elapsed)
+                with HTTP_LATENCY.lock:
+                    series[i] += 1
+                    series[-2] += elapsed
+                    series[-1] += 1
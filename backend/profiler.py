@@ -0,0 +1,68 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+# === PROFILER POR AMOSTRAGEM (OPT-IN) ===
+# Uma thread lê sys._current_frames() a cada PROFILE_INTERVAL segundos durante
+# uma janela e grava as pilhas no formato "collapsed" (uma linha por pilha:
+# raiz;...;folha contagem), pronto para flamegraph.pl / speedscope / inferno.
+# Só roda com PROFILE_ENABLED=1 e quando alguém liga: PROFILE_ON_START=<segundos>
+# ou a rota admin.
+
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0") == "1"
+PROFILE_ON_START = float(os.getenv("PROFILE_ON_START", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval=PROFILE_INTERVAL, out_dir=PROFILE_DIR):
+        self.interval = interval
+        self.out_dir = Path(out_dir)
+        self._thread = None
+        self.last_output = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds):
+        """Começa uma janela de `seconds`. Devolve o caminho do arquivo, ou None se já estiver rodando."""
+        if self.running:
+            return None
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        path = self.out_dir / f"profile-{time.strftime('%Y%m%d-%H%M%S')}.collapsed"
+        self._thread = threading.Thread(target=self._run, args=(seconds, path),
+                                        name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return path
+
+    def _run(self, seconds, path):
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}"))
+                stacks[";".join(reversed(labels))] += 1
+            time.sleep(self.interval)
+
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.last_output = path
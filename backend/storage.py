@@ -0,0 +1,507 @@
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from queue import Empty, Queue
+
+from .metrics import PERSISTENCE_LATENCY, WAL_RECORDS
+
+# === MOTOR DE PERSISTÊNCIA (WAL + SNAPSHOT) ===
+# O estado vive em dois lugares:
+#   - data.json       -> snapshot compactado {"seq": N, "meta": {...}, "incidents": [...]}
+#   - data.wal.<n>    -> segmentos append-only, uma operação JSON por linha
+# Cada operação recebe um "seq" crescente (um lote de N incidentes avança N).
+# No replay, tudo com seq <= snapshot é ignorado, então segmentos antigos podem
+# sobreviver a um crash sem duplicar nada.
+# "meta" (ex.: próximo id) viaja junto das operações e é gravado no snapshot.
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def read_snapshot(path):
+    """Lê o snapshot. Aceita o formato legado (lista pura) e devolve (seq, meta, incidentes)."""
+    path = Path(path)
+    if not path.exists():
+        return 0, {}, []
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            raw = json.load(f)
+        except json.JSONDecodeError:
+            return 0, {}, []
+    if isinstance(raw, list):
+        return 0, {}, raw
+    return raw.get("seq", 0), raw.get("meta", {}), raw.get("incidents", [])
+
+
+def write_snapshot(path, incidents, seq=0, meta=None):
+    """Grava o snapshot de forma atômica (tmp + fsync + rename)."""
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        # JSON válido, mas com um incidente por linha: o SnapshotStream lê em
+        # lotes com um json.loads por lote em vez de um parse por item
+        header = json.dumps({"seq": seq, "meta": meta or {}}, default=str)
+        f.write(header[:-1] + ', "incidents": [\n')
+        f.writelines(f"{',' if i else ''}{json.dumps(inc, default=str)}\n"
+                     for i, inc in enumerate(incidents))
+        f.write("]}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+
+class SnapshotStream:
+    """
+    Leitura incremental do snapshot: seq e meta são lidos na hora, os
+    incidentes saem em lotes (mais recente primeiro) conforme o arquivo é lido.
+    O formato do write_snapshot (um incidente por linha) é lido por linhas;
+    outros layouts passam pelo scanner item a item. Formato legado também
+    funciona; chaves fora de ordem ou arquivo ilegível caem no read_snapshot.
+    """
+
+    CHUNK = 1 << 20
+
+    def __init__(self, path):
+        self.seq, self.meta = 0, {}
+        self._decoder = json.JSONDecoder()
+        self._buf, self._pos, self._eof = "", 0, False
+        self._file = None
+        self._items = None
+        self._by_line = False
+        path = Path(path)
+        if not path.exists():
+            self._items = []
+            return
+        self._file = open(path, "r", encoding="utf-8")
+        try:
+            self._read_header()
+        except ValueError:
+            self.close()
+            self.seq, self.meta, self._items = read_snapshot(path)
+
+    # --- Parser ---
+    def _fill(self):
+        chunk = self._file.read(self.CHUNK)
+        if not chunk:
+            self._eof = True
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+
+    def _peek(self):
+        """Próximo caractere não-branco (sem consumir), ou "" no fim do arquivo."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or self._eof:
+                return self._buf[self._pos:self._pos + 1]
+            self._fill()
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"snapshot: esperado {char!r}")
+        self._pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # Valor colado no fim do buffer pode estar cortado ("12" de "123")
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def _read_header(self):
+        if self._peek() == "[":
+            # Formato legado: lista pura, sem seq/meta
+            self._pos += 1
+            return
+        self._expect("{")
+        has_seq = False
+        while self._peek() != "}":
+            key = self._value()
+            self._expect(":")
+            if key == "incidents":
+                # write_snapshot grava seq e meta antes da lista
+                if not has_seq:
+                    raise ValueError("snapshot: incidents antes do seq")
+                self._expect("[")
+                self._by_line = self._buf.startswith("\n", self._pos)
+                return
+            value = self._value()
+            if key == "seq":
+                self.seq, has_seq = value, True
+            elif key == "meta":
+                self.meta = value
+            if self._peek() == ",":
+                self._pos += 1
+        self._items = []
+
+    # --- API ---
+    def _elements(self):
+        scan, ws = self._decoder.scan_once, _WHITESPACE.match
+        if self._peek() == "]":
+            return
+        while True:
+            # Caminho rápido: elementos inteiros dentro do buffer, sem chamadas
+            # de método por item (o scanner em C faz o trabalho)
+            buf, pos, n = self._buf, self._pos, len(self._buf)
+            while True:
+                try:
+                    value, end = scan(buf, pos)
+                except (StopIteration, ValueError):
+                    break
+                i = ws(buf, end).end()
+                if i >= n:
+                    break
+                if buf[i] == "]":
+                    yield value
+                    return
+                if buf[i] != ",":
+                    raise ValueError("snapshot: esperado ','")
+                pos = ws(buf, i + 1).end()
+                yield value
+            # Fronteira do buffer: um elemento pelo caminho lento (com refill)
+            self._pos = pos
+            value = self._value()
+            sep = self._peek()
+            yield value
+            if sep == "]":
+                return
+            self._expect(",")
+
+    def _line_batches(self, size):
+        rest, lines = self._buf[self._pos:], []
+        while True:
+            chunk = self._file.read(self.CHUNK)
+            *complete, rest = (rest + chunk).split("\n")
+            for line in complete:
+                if line.startswith("]"):
+                    if lines:
+                        yield lines
+                    return
+                if line:
+                    lines.append(line)
+                    if len(lines) == size:
+                        yield lines
+                        lines = []
+            if not chunk:
+                raise ValueError("snapshot truncado")
+
+    def batches(self, size):
+        """Gera listas de até `size` incidentes, mais recente primeiro."""
+        if self._items is not None:
+            for i in range(0, len(self._items), size):
+                yield self._items[i:i + size]
+            return
+        if self._by_line:
+            try:
+                for lines in self._line_batches(size):
+                    # Linhas seguintes à primeira começam com ","
+                    yield json.loads("[" + "".join(lines).lstrip(",") + "]")
+            finally:
+                self.close()
+            return
+        batch = []
+        try:
+            for inc in self._elements():
+                batch.append(inc)
+                if len(batch) == size:
+                    yield batch
+                    batch = []
+        finally:
+            self.close()
+        if batch:
+            yield batch
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class IncidentJournal:
+    """
+    Write-ahead log com group commit: várias escritas concorrentes são
+    agrupadas num único write + fsync pela thread escritora.
+    """
+
+    def __init__(self, snapshot_path, snapshot_fn=None, compact_min=10_000,
+                 compact_ratio=1.0, fsync=True):
+        self.snapshot_path = Path(snapshot_path)
+        self.snapshot_fn = snapshot_fn
+        self.compact_min = compact_min
+        self.compact_ratio = compact_ratio
+        self.fsync = fsync
+
+        # Trava pública: quem muta o estado em memória deve segurá-la junto
+        # com o append, para que a ordem do WAL seja a ordem da memória.
+        self.lock = threading.RLock()
+        self.seq = 0
+        self.meta = {}
+        # Enquanto o estado em memória estiver incompleto (carga em andamento),
+        # snapshot_fn não representa tudo: compactar agora perderia histórico.
+        self.compaction_paused = False
+        # Erro de escrita no WAL (ex.: ENOSPC): a memória já aplicou mudanças que
+        # não estão no disco. Fail-stop: nenhuma escrita ou compactação depois disso.
+        self.failed = None
+
+        self._queue = Queue()
+        self._file = None
+        self._segment = 0
+        # Mudanças (incidentes, não registros) no WAL desde o último snapshot:
+        # um put_many de 10k conta 10k para o limiar de compactação
+        self._wal_changes = 0
+        self._snapshot_size = 0
+        self._compacting = threading.Lock()
+        self._writer = None
+        self._closed = False
+
+    # --- Segmentos ---
+    def _segment_path(self, n):
+        return self.snapshot_path.with_name(f"{self.snapshot_path.stem}.wal.{n:06d}")
+
+    def _segments(self):
+        prefix = f"{self.snapshot_path.stem}.wal."
+        found = []
+        for p in self.snapshot_path.parent.glob(prefix + "*"):
+            suffix = p.name[len(prefix):]
+            if suffix.isdigit():
+                found.append((int(suffix), p))
+        return sorted(found)
+
+    def _open_segment(self, n):
+        if self._file:
+            self._file.close()
+        self._segment = n
+        # Sem buffer do Python: um write que falha não deixa bytes pendentes para
+        # um flush posterior, e o ftruncate do _write_batch vale de verdade
+        self._file = open(self._segment_path(n), "ab", buffering=0)
+        _fsync_dir(self.snapshot_path.parent)
+
+    # --- Recuperação ---
+    def replay_stream(self, apply, batch_size=5000):
+        """
+        Replay sem montar o estado inteiro: lê o cabeçalho do snapshot, aplica
+        todo o WAL via apply(op) e devolve um gerador de lotes do snapshot (mais
+        recente primeiro) para o chamador carregar aos poucos. As operações do
+        WAL são mais novas que qualquer lote, então chegam antes deles.
+        """
+        snapshot = SnapshotStream(self.snapshot_path)
+        self.seq = snapshot.seq
+        self.meta = dict(snapshot.meta)
+        self._snapshot_size = 0
+        self._replay_wal(snapshot.seq, apply)
+
+        def batches():
+            count = 0
+            for batch in snapshot.batches(batch_size):
+                count += len(batch)
+                yield batch
+            self._snapshot_size = count
+
+        return batches()
+
+    def _replay_wal(self, snap_seq, apply):
+        self._wal_changes = 0
+        segments = self._segments()
+        for _, path in segments:
+            good_offset = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    good_offset += len(line)
+                    seq = op.get("seq", 0)
+                    if seq <= snap_seq:
+                        continue
+                    apply(op)
+                    self.meta.update(op.get("meta", {}))
+                    self.seq = max(self.seq, seq)
+                    self._wal_changes += len(op["incidents"]) if op.get("op") == "put_many" else 1
+            if good_offset < path.stat().st_size:
+                with open(path, "r+b") as f:
+                    f.truncate(good_offset)
+
+        self._open_segment(segments[-1][0] if segments else 1)
+
+    # --- Escrita ---
+    def start(self):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run, name="wal-writer", daemon=True)
+            self._writer.start()
+
+    def append(self, op, on_durable=None, count=1):
+        """
+        Enfileira uma operação e devolve um Future resolvido com o seq quando
+        ela estiver durável. Chame com self.lock seguro.
+        `count` é quantas mudanças a operação representa (lotes avançam o seq em N).
+        `on_durable(seq)` roda na thread escritora, na ordem do WAL.
+        """
+        with self.lock:
+            fut = Future()
+            if self.failed is not None:
+                fut.set_exception(self.failed)
+                return fut
+            self.seq += count
+            self.meta.update(op.get("meta", {}))
+            record = dict(op, seq=self.seq)
+            if on_durable is not None:
+                fut.add_done_callback(
+                    lambda f: f.exception() is None and on_durable(f.result()))
+            self._queue.put((record, fut, count))
+        return fut
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            # Group commit: drena tudo que chegou enquanto o último fsync rodava
+            stop = False
+            while True:
+                try:
+                    nxt = self._queue.get_nowait()
+                except Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+
+            self._write_batch(batch)
+            if stop:
+                return
+            self._maybe_compact()
+
+    def _write_batch(self, batch):
+        if self.failed is not None:
+            for _, fut, _ in batch:
+                fut.set_exception(self.failed)
+            return
+        start = time.perf_counter()
+        offset = self._file.tell()
+        try:
+            payload = b"".join(
+                json.dumps(rec, default=str, separators=(",", ":")).encode("utf-8") + b"\n"
+                for rec, _, _ in batch
+            )
+            view = memoryview(payload)
+            while view:
+                view = view[self._file.write(view):]
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        except Exception as e:
+            # Bytes parciais no fim do segmento colariam no próximo registro e o
+            # replay cortaria tudo dali em diante: volta ao ponto antes do lote
+            try:
+                os.ftruncate(self._file.fileno(), offset)
+            except OSError:
+                pass
+            self.failed = e
+            print(f"Erro ao gravar o WAL, escritas suspensas: {e}")
+            for _, fut, _ in batch:
+                fut.set_exception(e)
+            return
+        PERSISTENCE_LATENCY.observe(time.perf_counter() - start, "wal_commit")
+        WAL_RECORDS.inc(amount=len(batch))
+        self._wal_changes += sum(count for _, _, count in batch)
+        for rec, fut, _ in batch:
+            fut.set_result(rec["seq"])
+
+    # --- Compactação ---
+    def _maybe_compact(self):
+        if self.snapshot_fn is None or self.compaction_paused or self.failed is not None:
+            return
+        threshold = max(self.compact_min, int(self._snapshot_size * self.compact_ratio))
+        if self._wal_changes < threshold:
+            return
+        if not self._compacting.acquire(blocking=False):
+            return
+        # Rotaciona antes de copiar o estado: tudo que ficou nos segmentos
+        # antigos tem seq <= seq do snapshot e pode ser apagado depois.
+        old_segment = self._segment
+        self._open_segment(old_segment + 1)
+        self._wal_changes = 0
+        threading.Thread(target=self._compact, args=(old_segment,),
+                         name="wal-compact", daemon=True).start()
+
+    def _compact(self, upto_segment):
+        start = time.perf_counter()
+        try:
+            with self.lock:
+                incidents = list(self.snapshot_fn())
+                seq = self.seq
+                meta = dict(self.meta)
+            write_snapshot(self.snapshot_path, incidents, seq, meta)
+            self._snapshot_size = len(incidents)
+            for n, path in self._segments():
+                if n <= upto_segment:
+                    path.unlink(missing_ok=True)
+            PERSISTENCE_LATENCY.observe(time.perf_counter() - start, "compaction")
+        except Exception as e:
+            print(f"Erro na compactação do WAL: {e}")
+        finally:
+            self._compacting.release()
+
+    def compact_now(self, reopen=True):
+        """Compactação síncrona (usada no shutdown). Exige a thread escritora parada."""
+        if self.snapshot_fn is None:
+            return
+        with self._compacting:
+            with self.lock:
+                incidents = list(self.snapshot_fn())
+                seq = self.seq
+                meta = dict(self.meta)
+            write_snapshot(self.snapshot_path, incidents, seq, meta)
+            self._snapshot_size = len(incidents)
+            current = self._segment
+            if reopen:
+                self._open_segment(current + 1)
+            else:
+                self._file.close()
+                self._file = None
+            for n, path in self._segments():
+                if n <= current:
+                    path.unlink(missing_ok=True)
+            self._wal_changes = 0
+
+    def close(self, compact=True):
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        if compact and not self.compaction_paused and self.failed is None:
+            self.compact_now(reopen=False)
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,279 @@
+import threading
+from bisect import bisect_left, insort
+from collections import Counter, deque
+
+# === STORE EM MEMÓRIA (ÍNDICES) ===
+# - _slots: lista por ordem de chegada (ordinal), mais antigo primeiro.
+#   Leitura "mais recente primeiro" = percorrer de trás pra frente.
+# - _ord: id -> ordinal (índice hash para lookup O(1))
+# - _indexes: campo -> valor -> lista ordenada de ordinais
+# Ordinais nunca são reutilizados; o cursor de paginação é um ordinal.
+# - seq + _changes: sequência de mudanças para sync incremental (?since=<seq>)
+# - Carga incremental (cold start): o histórico chega depois, do mais novo para
+#   o mais antigo, em ordinais abaixo de _base (load_older).
+
+INDEXED_FIELDS = ("severity", "service", "acknowledged")
+CHANGELOG_SIZE = 10_000
+
+
+class IncidentStore:
+    def __init__(self, incidents=(), seq=0):
+        self.lock = threading.RLock()
+        self._reset(0)
+        self.seq = 0
+        self._changes = deque()
+        self._changes_floor = 0
+        self.loading = False
+        self._tombstones = set()
+        self._late_history = False
+        # Lotes de histórico carregados: mudam páginas e stats sem mexer no seq
+        self.history_batches = 0
+        self.load(incidents)
+        self.reset_changelog(seq)
+
+    def _reset(self, base):
+        self._base = base
+        self._slots = []
+        self._ord = {}
+        self._indexes = {field: {} for field in INDEXED_FIELDS}
+        self._severity_counts = Counter()
+
+    def load(self, incidents):
+        """Carrega uma lista no formato da API (mais recente primeiro)."""
+        with self.lock:
+            for inc in reversed(list(incidents)):
+                self.put(inc)
+
+    def reset_changelog(self, seq):
+        """
+        Recomeça o changelog em `seq`. A carga inicial não entra no changelog;
+        o seq parte do seq do WAL para continuar crescendo entre reinícios.
+        """
+        with self.lock:
+            self.seq = seq
+            self._changes.clear()
+            self._changes_floor = seq
+            self._late_history = False
+
+    def apply(self, op):
+        """Aplica uma operação do WAL (put, put_many, delete, clear; o resto é no-op)."""
+        kind = op.get("op")
+        if kind == "put":
+            self.put(op["incident"])
+        elif kind == "put_many":
+            for inc in op["incidents"]:
+                self.put(inc)
+        elif kind == "delete":
+            self.delete(op["id"])
+        elif kind == "clear":
+            self.clear()
+
+    def _record(self, kind, inc_id=None):
+        self.seq += 1
+        if len(self._changes) == CHANGELOG_SIZE:
+            self._changes_floor = self._changes.popleft()[0]
+        self._changes.append((self.seq, kind, inc_id))
+
+    # --- Escrita ---
+    def put(self, inc):
+        """Insere um incidente novo no topo, ou substitui um existente mantendo a posição."""
+        with self.lock:
+            ordinal = self._ord.get(inc["id"])
+            if ordinal is None:
+                ordinal = self._base + len(self._slots)
+                self._slots.append(inc)
+                self._ord[inc["id"]] = ordinal
+                old = None
+            else:
+                pos = ordinal - self._base
+                old = self._slots[pos]
+                self._slots[pos] = inc
+                self._severity_counts[old.get("severity")] -= 1
+            self._severity_counts[inc.get("severity")] += 1
+
+            for field in INDEXED_FIELDS:
+                value = inc.get(field)
+                if old is not None and old.get(field) == value:
+                    continue
+                bucket = self._indexes[field].setdefault(value, [])
+                i = bisect_left(bucket, ordinal)
+                if i == len(bucket) or bucket[i] != ordinal:
+                    insort(bucket, ordinal)
+            self._record("put", inc["id"])
+            return inc
+
+    def delete(self, inc_id):
+        with self.lock:
+            if self.loading:
+                # O histórico ainda não lido pode conter esse id: não ressuscitar
+                self._tombstones.add(inc_id)
+            ordinal = self._ord.pop(inc_id, None)
+            if ordinal is None:
+                return None
+            pos = ordinal - self._base
+            inc = self._slots[pos]
+            self._slots[pos] = None
+            self._severity_counts[inc.get("severity")] -= 1
+            self._record("delete", inc_id)
+            return inc
+
+    def clear(self):
+        with self.lock:
+            self._reset(self._base + len(self._slots))
+            # O resto do histórico foi apagado junto: load_older passa a ignorar
+            self.loading = False
+            self._tombstones.clear()
+            self._record("clear")
+
+    # --- Carga incremental ---
+    def start_loading(self):
+        with self.lock:
+            self.loading = True
+
+    def load_older(self, incidents):
+        """
+        Acrescenta um lote de incidentes mais antigos que tudo o que já está no
+        store (lista mais recente primeiro). Um id que já chegou por escrita nova
+        ou pelo WAL mantém a versão atual, mas volta para a posição original;
+        ids apagados durante a carga são ignorados.
+        """
+        with self.lock:
+            if not self.loading:
+                return
+            older = [inc for inc in reversed(incidents) if inc["id"] not in self._tombstones]
+            base = self._base - len(older)
+            for offset, inc in enumerate(older):
+                current = self._ord.get(inc["id"])
+                if current is None:
+                    self._severity_counts[inc.get("severity")] += 1
+                else:
+                    # Slot antigo vira buraco (como no delete); a query pula
+                    pos = current - self._base
+                    inc = older[offset] = self._slots[pos]
+                    self._slots[pos] = None
+                self._ord[inc["id"]] = base + offset
+
+            for field in INDEXED_FIELDS:
+                grouped = {}
+                for offset, inc in enumerate(older):
+                    grouped.setdefault(inc.get(field), []).append(base + offset)
+                index = self._indexes[field]
+                for value, ordinals in grouped.items():
+                    # Ordinais novos são menores que todos os existentes
+                    index.setdefault(value, [])[:0] = ordinals
+            self._slots[:0] = older
+            self._base = base
+            if older:
+                self.history_batches += 1
+                self._late_history = True
+
+    def finish_loading(self):
+        """
+        Fim da carga incremental. Se chegou histórico depois do reset_changelog
+        (ou seja, alguém pode ter visto a lista parcial), registra um "reload":
+        quem sincronizou recebe reset no próximo delta. Devolve True nesse caso.
+        """
+        with self.lock:
+            if not self.loading:
+                return False
+            self.loading = False
+            self._tombstones.clear()
+            if not self._late_history:
+                return False
+            self._record("reload")
+            return True
+
+    # --- Leitura ---
+    def __len__(self):
+        return len(self._ord)
+
+    def get(self, inc_id):
+        # Sob a trava: load_older e clear mudam _ord, _slots e _base em passos separados
+        with self.lock:
+            ordinal = self._ord.get(inc_id)
+            if ordinal is None:
+                return None
+            return self._slots[ordinal - self._base]
+
+    def all(self):
+        """Todos os incidentes, mais recente primeiro (usado no snapshot)."""
+        with self.lock:
+            return [inc for inc in reversed(self._slots) if inc is not None]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "total": len(self._ord),
+                "by_severity": {k: v for k, v in self._severity_counts.items() if v > 0},
+            }
+
+    def query(self, limit=100, cursor=None, **filters):
+        """
+        Página mais-recente-primeiro. `cursor` é o ordinal exclusivo a partir do
+        qual continuar (vem de next_cursor da página anterior).
+        Devolve (itens, next_cursor) — next_cursor é None na última página.
+        """
+        filters = {k: v for k, v in filters.items() if v is not None}
+        with self.lock:
+            end = self._base + len(self._slots)
+            if cursor is not None:
+                end = min(end, cursor)
+
+            if filters:
+                # Percorre o índice mais seletivo e confere os demais filtros
+                candidates = []
+                for field, value in filters.items():
+                    if field not in self._indexes:
+                        raise KeyError(field)
+                    candidates.append(self._indexes[field].get(value, []))
+                bucket = min(candidates, key=len)
+                ordinals = (bucket[i] for i in range(bisect_left(bucket, end) - 1, -1, -1))
+            else:
+                ordinals = range(end - 1, self._base - 1, -1)
+
+            items = []
+            last = None
+            for ordinal in ordinals:
+                pos = ordinal - self._base
+                if pos < 0:
+                    break
+                inc = self._slots[pos]
+                if inc is None or any(inc.get(k) != v for k, v in filters.items()):
+                    continue
+                if len(items) == limit:
+                    return items, last
+                items.append(inc)
+                last = ordinal
+            return items, None
+
+    def changes_since(self, since):
+        """
+        Delta desde `since`: incidentes inseridos/alterados (estado atual) e ids
+        apagados. Se o changelog não cobre mais esse ponto (ou houve um clear),
+        devolve reset=True e o cliente deve recarregar do zero.
+        """
+        with self.lock:
+            delta = {"seq": self.seq, "reset": False, "upserts": [], "deletes": []}
+            if since == self.seq:
+                return delta
+            if since > self.seq or since < self._changes_floor:
+                delta["reset"] = True
+                return delta
+
+            seen = set()
+            for seq, kind, inc_id in reversed(self._changes):
+                if seq <= since:
+                    break
+                if kind in ("clear", "reload"):
+                    delta["reset"] = True
+                    delta["upserts"], delta["deletes"] = [], []
+                    return delta
+                if inc_id in seen:
+                    continue
+                seen.add(inc_id)
+                inc = self.get(inc_id)
+                if inc is None:
+                    delta["deletes"].append(inc_id)
+                else:
+                    delta["upserts"].append(inc)
+            return delta
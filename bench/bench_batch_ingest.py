@@ -0,0 +1,68 @@
+"""
+Benchmark: incidentes/s em POST /api/incidents (um por vez) vs
+POST /api/incidents:batch com lotes de 1 a 10k (JSON array e NDJSON).
+
+    python bench/bench_batch_ingest.py --total 20000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def item(i):
+    return {"severity": ("crit", "warn", "info")[i % 3], "service": f"svc-{i % 50}", "summary": "rajada"}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--total", type=int, default=20_000, help="incidentes por cenário")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1_000, 10_000])
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATA_DIR"] = tmp
+    os.environ["GEMINI_API_KEY"] = ""
+    from fastapi.testclient import TestClient
+
+    import backend.app as app_module
+
+    def report(name, count, elapsed):
+        print(f"{name:>28} {count / elapsed:>12.0f}")
+
+    print(f"{'cenário':>28} {'incidentes/s':>12}")
+    with TestClient(app_module.app) as client:
+        n = min(args.total, 2_000)
+        start = time.perf_counter()
+        for i in range(n):
+            client.post("/api/incidents", json=item(i))
+        report("único, sequencial", n, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as ex:
+            list(ex.map(lambda i: client.post("/api/incidents", json=item(i)), range(n)))
+        report(f"único, {args.threads} threads", n, time.perf_counter() - start)
+
+        for size in args.sizes:
+            batches = max(1, min(args.total, 2_000 * size) // size)
+            array = json.dumps([item(i) for i in range(size)])
+            ndjson = "\n".join(json.dumps(item(i)) for i in range(size)) + "\n"
+            for label, body, ctype in (("JSON", array, "application/json"),
+                                       ("NDJSON", ndjson, "application/x-ndjson")):
+                start = time.perf_counter()
+                for _ in range(batches):
+                    r = client.post("/api/incidents:batch", content=body, headers={"content-type": ctype})
+                    assert r.status_code == 200, r.text
+                report(f"lote {size} ({label})", batches * size, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: cold start do backend.
+
+Mede, em processos novos (como um container subindo):
+  - import: tempo de `import backend.app` (e se o SDK do Gemini foi carregado)
+  - ready: do spawn do uvicorn até o primeiro 200 em /api/health
+  - histórico: do spawn até /api/health reportar history_loaded=true
+
+O snapshot tem --size incidentes e GEMINI_API_KEY vem preenchida, para que um
+import eager do SDK apareça no número. Acompanhe em regressões:
+
+    python bench/bench_cold_start.py --size 200000 --runs 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import backend.app
+print(json.dumps({"import": time.perf_counter() - start, "genai": "google.genai" in sys.modules}))
+"""
+
+
+def make_snapshot(data_dir, size):
+    from backend.storage import write_snapshot
+
+    incidents = [
+        {"id": f"INC-{1000 + i}", "severity": ("info", "warn", "crit")[i % 3],
+         "service": f"svc-{i % 20}", "summary": "Falha simulada para o benchmark",
+         "deep_log": "[KERNEL] General Protection Fault", "opened_at": "2025-12-18T19:04:59",
+         "acknowledged": False}
+        for i in range(size - 1, -1, -1)
+    ]
+    write_snapshot(Path(data_dir) / "data.json", incidents, seq=size, meta={"next_id": 1000 + size})
+
+
+def measure_import(env):
+    out = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure_startup(env, port):
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app:app", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    ready = loaded = None
+    try:
+        with httpx.Client(timeout=5) as http:
+            while loaded is None and time.perf_counter() - start < 300:
+                try:
+                    r = http.get(f"http://127.0.0.1:{port}/api/health")
+                except httpx.TransportError:
+                    time.sleep(0.01)
+                    continue
+                now = time.perf_counter() - start
+                if r.status_code == 200:
+                    ready = ready or now
+                    if r.json().get("history_loaded", True):
+                        loaded = now
+                time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+    if loaded is None:
+        raise RuntimeError("backend não ficou pronto")
+    return ready, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8769)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        make_snapshot(tmp, args.size)
+        env = dict(os.environ, DATA_DIR=tmp, GEMINI_API_KEY="bench")
+
+        imports, readies, loads = [], [], []
+        genai = False
+        for _ in range(args.runs):
+            probe = measure_import(env)
+            imports.append(probe["import"])
+            genai = genai or probe["genai"]
+            ready, loaded = measure_startup(env, args.port)
+            readies.append(ready)
+            loads.append(loaded)
+
+    print(f"snapshot com {args.size} incidentes, {args.runs} execuções")
+    print(f"{'etapa':>24} {'mediana (s)':>12} {'mín (s)':>10}")
+    for name, samples in (("import backend.app", imports),
+                          ("1º 200 em /api/health", readies),
+                          ("histórico completo", loads)):
+        print(f"{name:>24} {statistics.median(samples):>12.3f} {min(samples):>10.3f}")
+    print(f"google.genai importado no import: {'sim' if genai else 'não'}")
+
+
+if __name__ == "__main__":
+    main()
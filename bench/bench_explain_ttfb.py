@@ -0,0 +1,93 @@
+"""
+Benchmark: time-to-first-token de /explain vs /explain/stream.
+
+Sobe o stub do Gemini em modo streaming (primeiro token após --ttft, geração
+completa em --latency) e compara, com cache frio, quanto tempo leva até o
+primeiro pedaço de HTML chegar ao cliente.
+
+    python bench/bench_explain_ttfb.py --ttft 0.3 --latency 3 --rounds 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+async def wait_ready(url):
+    async with httpx.AsyncClient() as http:
+        for _ in range(200):
+            try:
+                await http.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+    raise RuntimeError(f"{url} não subiu")
+
+
+async def first_chunk(http, url):
+    start = time.perf_counter()
+    first = None
+    async with http.stream("GET", url) as res:
+        async for line in res.aiter_lines():
+            if first is None and (line.startswith("data: ") or line.startswith("{")):
+                first = time.perf_counter() - start
+    return first * 1000, (time.perf_counter() - start) * 1000
+
+
+async def run(args):
+    base = f"http://127.0.0.1:{args.port}"
+    await wait_ready(f"{base}/api/health")
+    async with httpx.AsyncClient(timeout=120) as http:
+        print(f"{'rota':>22} {'1º pedaço (ms)':>15} {'total (ms)':>11}")
+        for suffix in ("explain", "explain/stream"):
+            firsts, totals = [], []
+            for _ in range(args.rounds):
+                # Incidente novo a cada rodada: cache frio
+                inc_id = (await http.post(f"{base}/api/incidents", json={"service": "bench"})).json()["id"]
+                first, total = await first_chunk(http, f"{base}/api/incidents/{inc_id}/{suffix}")
+                firsts.append(first)
+                totals.append(total)
+            print(f"{'/' + suffix:>22} {statistics.median(firsts):>15.0f} {statistics.median(totals):>11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--latency", type=float, default=3.0)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8769)
+    parser.add_argument("--stub-port", type=int, default=8791)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "bench.stub_llm:app", "--port", str(args.stub_port),
+             "--log-level", "warning"],
+            cwd=ROOT, env=dict(os.environ, STUB_LATENCY=str(args.latency), STUB_TTFT=str(args.ttft)),
+        )
+        env = dict(os.environ, DATA_DIR=tmp, GEMINI_API_KEY="stub",
+                   GEMINI_BASE_URL=f"http://127.0.0.1:{args.stub_port}")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.app:app", "--port", str(args.port),
+             "--log-level", "warning"],
+            cwd=ROOT, env=env,
+        )
+        try:
+            asyncio.run(run(args))
+        finally:
+            for proc in (server, stub):
+                proc.terminate()
+                proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: latência de GET /api/incidents com um store de 100k incidentes.
+
+Mede o store (query) e a rota completa via TestClient, com e sem filtros.
+
+    python bench/bench_list_incidents.py --size 100000
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backend.store import IncidentStore  # noqa: E402
+
+
+def make_incidents(n):
+    return [
+        {
+            "id": f"INC-{1000 + i}",
+            "severity": ("crit", "warn", "info")[i % 3],
+            "service": f"svc-{i % 50}",
+            "summary": "Carga sintética de benchmark",
+            "opened_at": "2025-01-01T00:00:00",
+            "acknowledged": i % 7 == 0,
+        }
+        for i in reversed(range(n))
+    ]
+
+
+def timeit(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=2_000)
+    args = parser.parse_args()
+
+    store = IncidentStore(make_incidents(args.size))
+    _, cursor = store.query(limit=100)
+
+    cases = {
+        "primeira página": lambda: store.query(limit=100),
+        "página via cursor": lambda: store.query(limit=100, cursor=cursor),
+        "severity=crit": lambda: store.query(limit=100, severity="crit"),
+        "service+ack": lambda: store.query(limit=100, service="svc-7", acknowledged=True),
+        "lookup por id": lambda: store.get(f"INC-{1000 + args.size // 2}"),
+        "stats": store.stats,
+    }
+    print(f"store com {args.size} incidentes ({args.rounds} rodadas)")
+    print(f"{'caso':>20} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for name, fn in cases.items():
+        p50, p99 = timeit(fn, args.rounds)
+        print(f"{name:>20} {p50:>10.4f} {p99:>10.4f}")
+
+    # Rota completa (inclui serialização e o overhead do TestClient)
+    import os
+    import tempfile
+
+    from fastapi.testclient import TestClient
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATA_DIR"] = tmp
+        os.environ["GEMINI_API_KEY"] = ""
+        import backend.app as app_module
+
+        app_module.INCIDENTS.load(make_incidents(args.size))
+        with TestClient(app_module.app) as client:
+            p50, p99 = timeit(lambda: client.get("/api/incidents?limit=100"), args.rounds // 4)
+            print(f"{'GET /api/incidents':>20} {p50:>10.4f} {p99:>10.4f}")
+            p50, p99 = timeit(lambda: client.get("/api/health"), args.rounds // 4)
+            print(f"{'GET /api/health':>20} {p50:>10.4f} {p99:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
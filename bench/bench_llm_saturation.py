@@ -0,0 +1,138 @@
+"""
+Benchmark: p99 das rotas sem LLM enquanto as rotas de IA estão saturadas.
+
+Sobe o stub do Gemini (bench/stub_llm.py) e o backend apontando para ele,
+mantém --llm-inflight chamadas a /explain e /oracle em voo e mede a latência
+de /api/health e /api/incidents em paralelo. Cada /explain usa um incidente
+novo (criados num lote antes da medição): com o cache de explicações, repetir
+o mesmo id viraria hit/coalescência e a carga não chegaria ao LLM.
+
+    python bench/bench_llm_saturation.py --llm-inflight 64 --stub-latency 2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+async def wait_ready(url):
+    async with httpx.AsyncClient() as http:
+        for _ in range(200):
+            try:
+                await http.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+    raise RuntimeError(f"{url} não subiu")
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[max(0, int(len(samples) * 0.99) - 1)]
+
+
+async def probe(http, base, path, seconds):
+    samples = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        await http.get(f"{base}{path}")
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+    return samples
+
+
+async def saturate(http, base, inc_ids, stop):
+    i = 0
+    while not stop.is_set():
+        i += 1
+        if i % 2:
+            inc_id = next(inc_ids, None)
+            if inc_id is None:
+                raise RuntimeError("--explain-pool esgotado: aumente o valor")
+            path = f"/api/incidents/{inc_id}/explain"
+        else:
+            path = "/api/oracle"
+        try:
+            await http.get(f"{base}{path}", timeout=120)
+        except httpx.HTTPError:
+            pass
+
+
+async def run(args):
+    base = f"http://127.0.0.1:{args.port}"
+    await wait_ready(f"{base}/api/health")
+    limits = httpx.Limits(max_connections=args.llm_inflight + 8)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as http:
+        # Um lote só (um commit), antes de medir
+        created = await http.post(f"{base}/api/incidents:batch",
+                                  json=[{"service": "bench"}] * args.explain_pool)
+        inc_ids = iter(created.json()["ids"])
+
+        print(f"{'cenário':>16} {'rota':>16} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+        for label, inflight in (("ocioso", 0), ("LLM saturado", args.llm_inflight)):
+            stop = asyncio.Event()
+            load = [asyncio.ensure_future(saturate(http, base, inc_ids, stop)) for _ in range(inflight)]
+            await asyncio.sleep(1 if inflight else 0)
+            health, listing = await asyncio.gather(
+                probe(http, base, "/api/health", args.seconds),
+                probe(http, base, "/api/incidents?limit=100", args.seconds),
+            )
+            stop.set()
+            for name, samples in (("/api/health", health), ("/api/incidents", listing)):
+                p50, p99 = percentiles(samples)
+                print(f"{label:>16} {name:>16} {p50:>10.1f} {p99:>10.1f}")
+            for task in load:
+                task.cancel()
+            for result in await asyncio.gather(*load, return_exceptions=True):
+                if isinstance(result, RuntimeError):
+                    raise result
+
+        # Deve ficar em zero: toda chamada a /explain chegou ao stub
+        cache = (await http.get(f"{base}/api/ai/cache")).json()
+        print(f"cache de explicações: hits={cache.get('hits', 0)} coalesced={cache.get('coalesced', 0)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-inflight", type=int, default=64)
+    parser.add_argument("--stub-latency", type=float, default=2.0)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--explain-pool", type=int, default=10_000,
+                        help="incidentes criados para o /explain (um por chamada)")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--stub-port", type=int, default=8790)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "bench.stub_llm:app", "--port", str(args.stub_port),
+             "--log-level", "warning"],
+            cwd=ROOT, env=dict(os.environ, STUB_LATENCY=str(args.stub_latency)),
+        )
+        env = dict(os.environ, DATA_DIR=tmp, GEMINI_API_KEY="stub",
+                   GEMINI_BASE_URL=f"http://127.0.0.1:{args.stub_port}")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.app:app", "--port", str(args.port),
+             "--log-level", "warning"],
+            cwd=ROOT, env=env,
+        )
+        try:
+            asyncio.run(run(args))
+        finally:
+            for proc in (server, stub):
+                proc.terminate()
+                proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: custo do MetricsMiddleware por requisição.
+
+O orçamento é < 2% a 5k req/s, ou seja < 4 µs por requisição. Duas medidas:
+  - middleware: MetricsMiddleware em volta de um app ASGI mínimo, no mesmo
+    processo, alternando com o app sem middleware. É o número que vale para o
+    orçamento.
+  - app: GET /api/health no app completo (sem rede), METRICS_ENABLED=1 e =0 em
+    subprocessos alternados. A rota passa pelo threadpool e varia dezenas de
+    µs entre execuções: serve de contexto, não resolve diferenças de poucos µs.
+
+    python bench/bench_metrics_overhead.py --requests 50000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def worker(requests):
+    import asyncio
+
+    import backend.app as app_module
+
+    app = app_module.app
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/health", "raw_path": b"/api/health", "query_string": b"",
+        "root_path": "", "headers": [], "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def run():
+        async with app.router.lifespan_context(app):
+            for _ in range(1_000):
+                await app(dict(scope), receive, send)
+            start = time.perf_counter()
+            for _ in range(requests):
+                await app(dict(scope), receive, send)
+            return time.perf_counter() - start
+
+    elapsed = asyncio.run(run())
+    print(json.dumps({"us_per_request": elapsed / requests * 1e6}))
+
+
+def isolated(requests, repeat):
+    import asyncio
+
+    from backend.metrics import MetricsMiddleware
+
+    class Route:
+        path = "/api/health"
+
+    async def endpoint(scope, receive, send):
+        scope["route"] = Route
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-length", b"2"), (b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    scope = {"type": "http", "method": "GET", "path": "/api/health"}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def timed(app):
+        start = time.perf_counter()
+        for _ in range(requests):
+            await app(dict(scope), receive, send)
+        return (time.perf_counter() - start) / requests * 1e6
+
+    async def run():
+        wrapped = MetricsMiddleware(endpoint)
+        bare, metered = [], []
+        for _ in range(repeat):
+            bare.append(await timed(endpoint))
+            metered.append(await timed(wrapped))
+        return min(bare), min(metered)
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.requests)
+        return
+
+    bare, metered = isolated(args.requests, args.repeat * 2)
+
+    runs = {"0": [], "1": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Alterna sem/com métricas para a deriva da máquina pesar igual nos dois
+        for _ in range(args.repeat):
+            for enabled in ("0", "1"):
+                env = dict(os.environ, DATA_DIR=tmp, GEMINI_API_KEY="", METRICS_ENABLED=enabled)
+                out = subprocess.run([sys.executable, __file__, "--worker", "--requests", str(args.requests)],
+                                     cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+                runs[enabled].append(json.loads(out.stdout.strip().splitlines()[-1])["us_per_request"])
+
+    off, on = min(runs["0"]), min(runs["1"])
+    print(f"middleware:    {metered - bare:8.2f} µs/req ({bare:.2f} -> {metered:.2f}; "
+          f"{(metered - bare) / 200 * 100:.2f}% do orçamento de 200 µs a 5k req/s)")
+    print(f"app sem métricas: {off:8.1f} µs/req")
+    print(f"app com métricas: {on:8.1f} µs/req ({on - off:+.1f}, dentro do ruído da rota)")
+
+
+if __name__ == "__main__":
+    main()
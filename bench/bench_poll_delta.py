@@ -0,0 +1,93 @@
+"""
+Load test: bytes e CPU por poll do dashboard, antes e depois do sync incremental.
+
+Simula um dashboard fazendo polls enquanto chegam incidentes novos
+(--new-per-poll por ciclo). CPU = time.process_time do processo todo
+(cliente TestClient + app), então compare os modos entre si.
+
+    python bench/bench_poll_delta.py --size 1000 --polls 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def make_incidents(n):
+    return [
+        {
+            "id": f"INC-{1000 + i}",
+            "severity": ("crit", "warn", "info")[i % 3],
+            "service": f"svc-{i % 50}",
+            "summary": "Carga sintética de benchmark",
+            "deep_log": "[BENCH] synthetic",
+            "opened_at": "2025-01-01T00:00:00",
+            "acknowledged": False,
+        }
+        for i in reversed(range(n))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1_000)
+    parser.add_argument("--polls", type=int, default=500)
+    parser.add_argument("--new-per-poll", type=float, default=0.1,
+                        help="incidentes novos por ciclo de poll (0.1 = 1 a cada 10 polls)")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATA_DIR"] = tmp
+    os.environ["GEMINI_API_KEY"] = ""
+    from fastapi.testclient import TestClient
+
+    import backend.app as app_module
+
+    app_module.INCIDENTS.load(make_incidents(args.size))
+    payload = {"severity": "crit", "service": "bench", "summary": "poll"}
+
+    def antes(client, state):
+        # Comportamento original: a lista inteira a cada 5s
+        r = client.get(f"/api/incidents?limit={min(args.size + 100, 1000)}")
+        return len(r.content)
+
+    def pagina(client, state):
+        a = client.get("/api/incidents?limit=100")
+        b = client.get("/api/incidents/stats")
+        return len(a.content) + len(b.content)
+
+    def delta(client, state):
+        headers = {"If-None-Match": state["etag"]} if state.get("etag") else {}
+        r = client.get(f"/api/incidents?since={state['seq']}", headers=headers)
+        if r.status_code == 200:
+            state["seq"] = r.json()["seq"]
+            state["etag"] = r.headers["etag"]
+        return len(r.content)
+
+    modes = {"lista completa": antes, "página + stats": pagina, "delta + ETag/304": delta}
+    print(f"{args.size} incidentes, {args.polls} polls, {args.new_per_poll} novos/poll")
+    print(f"{'modo':>18} {'bytes/poll':>12} {'CPU ms/poll':>12}")
+    with TestClient(app_module.app) as client:
+        for name, poll in modes.items():
+            state = {"seq": int(client.get("/api/incidents?limit=1").headers["x-incidents-seq"])}
+            total_bytes = 0
+            pending = 0.0
+            cpu = 0.0
+            for _ in range(args.polls):
+                pending += args.new_per_poll
+                while pending >= 1:
+                    client.post("/api/incidents", json=payload)
+                    pending -= 1
+                start = time.process_time()
+                total_bytes += poll(client, state)
+                cpu += time.process_time() - start
+            print(f"{name:>18} {total_bytes / args.polls:>12.0f} {cpu * 1000 / args.polls:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: vazão de POST /api/incidents conforme o histórico cresce.
+
+Cada tamanho roda num subprocesso limpo com DATA_DIR apontando para um
+diretório temporário pré-populado com N incidentes.
+
+    python bench/bench_post_throughput.py --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def make_snapshot(directory, n):
+    incidents = [
+        {
+            "id": f"INC-{1000 + i}",
+            "severity": ("crit", "warn", "info")[i % 3],
+            "service": f"svc-{i % 50}",
+            "summary": "Carga sintética de benchmark",
+            "deep_log": "[BENCH] synthetic",
+            "opened_at": "2025-01-01T00:00:00",
+            "acknowledged": False,
+        }
+        for i in reversed(range(n))
+    ]
+    with open(Path(directory) / "data.json", "w", encoding="utf-8") as f:
+        json.dump({"seq": 0, "incidents": incidents}, f)
+
+
+def worker(requests, threads):
+    from concurrent.futures import ThreadPoolExecutor
+    from fastapi.testclient import TestClient
+
+    import backend.app as app_module
+
+    payload = {"severity": "crit", "service": "bench", "summary": "burst"}
+    with TestClient(app_module.app) as client:
+        client.post("/api/incidents", json=payload)  # aquecimento
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as ex:
+            codes = list(ex.map(lambda _: client.post("/api/incidents", json=payload).status_code,
+                                range(requests)))
+        elapsed = time.perf_counter() - start
+    assert all(c == 200 for c in codes), "POST falhou durante o benchmark"
+    print(json.dumps({"elapsed": elapsed, "rps": requests / elapsed}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.requests, args.threads)
+        return
+
+    print(f"{'incidentes':>12} {'POST/s':>10} {'tempo (s)':>10}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            make_snapshot(tmp, n)
+            env = dict(os.environ, DATA_DIR=tmp, GEMINI_API_KEY="")
+            out = subprocess.run(
+                [sys.executable, __file__, "--worker",
+                 "--requests", str(args.requests), "--threads", str(args.threads)],
+                cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+            result = json.loads(out)
+            print(f"{n:>12} {result['rps']:>10.0f} {result['elapsed']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: assinantes ociosos em /api/incidents/stream num único worker.
+
+Sobe o uvicorn num subprocesso, abre N WebSockets ociosos, mede a memória do
+servidor e o tempo até um POST chegar a todos os assinantes.
+
+    python bench/bench_stream_fanout.py --clients 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from websockets.asyncio.client import connect
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def wait_ready(base):
+    async with httpx.AsyncClient() as http:
+        for _ in range(200):
+            try:
+                if (await http.get(f"{base}/api/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.05)
+    raise RuntimeError("servidor não subiu")
+
+
+async def run(args, pid):
+    base = f"http://127.0.0.1:{args.port}"
+    ws_url = f"ws://127.0.0.1:{args.port}/api/incidents/stream?since=0"
+    await wait_ready(base)
+    idle_rss = rss_mb(pid)
+
+    sockets = []
+    start = time.perf_counter()
+    for i in range(0, args.clients, args.batch):
+        batch = await asyncio.gather(*(connect(ws_url, ping_interval=None, max_queue=4)
+                                       for _ in range(min(args.batch, args.clients - i))))
+        for ws in batch:
+            await ws.recv()  # snapshot inicial
+        sockets.extend(batch)
+    connect_time = time.perf_counter() - start
+    await asyncio.sleep(1)
+    loaded_rss = rss_mb(pid)
+
+    async def first_event(ws):
+        while True:
+            message = json.loads(await ws.recv())
+            if not message.get("ping"):
+                return time.perf_counter()
+
+    waiters = [asyncio.ensure_future(first_event(ws)) for ws in sockets]
+    async with httpx.AsyncClient() as http:
+        sent = time.perf_counter()
+        await http.post(f"{base}/api/incidents", json={"severity": "crit", "service": "bench"})
+    arrivals = sorted(await asyncio.gather(*waiters))
+    p50 = (arrivals[len(arrivals) // 2] - sent) * 1000
+    last = (arrivals[-1] - sent) * 1000
+
+    print(f"assinantes:            {len(sockets)}")
+    print(f"tempo p/ conectar:     {connect_time:.1f} s")
+    print(f"RSS servidor ocioso:   {idle_rss:.0f} MB")
+    print(f"RSS com assinantes:    {loaded_rss:.0f} MB ({(loaded_rss - idle_rss) * 1024 / len(sockets):.1f} KB/assinante)")
+    print(f"fan-out de 1 evento:   p50 {p50:.0f} ms, último {last:.0f} ms")
+
+    await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATA_DIR=tmp, GEMINI_API_KEY="")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.app:app", "--port", str(args.port),
+             "--log-level", "warning", "--backlog", "4096"],
+            cwd=ROOT, env=env,
+        )
+        try:
+            asyncio.run(run(args, server.pid))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
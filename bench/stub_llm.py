@@ -0,0 +1,46 @@
+"""
+Stub local da API do Gemini para benchmarks (sem rede, latência controlada).
+
+    STUB_LATENCY=2.0 uvicorn bench.stub_llm:app --port 8790
+
+Aponte o backend com GEMINI_BASE_URL=http://127.0.0.1:8790 e qualquer GEMINI_API_KEY.
+"""
+import asyncio
+import json
+import os
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+STUB_LATENCY = float(os.getenv("STUB_LATENCY", "2.0"))
+# streamGenerateContent: primeiro token após STUB_TTFT, o resto espalhado até STUB_LATENCY
+STUB_TTFT = float(os.getenv("STUB_TTFT", "0.3"))
+STUB_CHUNKS = int(os.getenv("STUB_CHUNKS", "20"))
+STUB_TEXT = "<p><b>Stub:</b> causa raiz simulada.</p>"
+
+app = FastAPI(title="Stub Gemini")
+
+
+def candidate(text):
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+        "usageMetadata": {"promptTokenCount": 1, "candidatesTokenCount": 1, "totalTokenCount": 2},
+    }
+
+
+@app.post("/{version}/models/{action}")
+async def generate(version: str, action: str, request: Request):
+    await request.body()
+    if action.endswith(":streamGenerateContent"):
+        return StreamingResponse(stream_chunks(), media_type="text/event-stream")
+    await asyncio.sleep(STUB_LATENCY)
+    return candidate(STUB_TEXT)
+
+
+async def stream_chunks():
+    await asyncio.sleep(STUB_TTFT)
+    gap = max(0.0, STUB_LATENCY - STUB_TTFT) / max(1, STUB_CHUNKS - 1)
+    for i in range(STUB_CHUNKS):
+        if i:
+            await asyncio.sleep(gap)
+        yield f"data: {json.dumps(candidate(f'<span>token {i}</span> '))}\r\n\r\n"
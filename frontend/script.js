@@ -10,6 +10,9 @@ const btnCreate = document.getElementById("btnCreateIncident");
 // Variável para guardar o gráfico (para poder deletar e recriar)
 let myChart = null;
 
+// Quantos incidentes a tabela mostra (o backend pagina)
+const PAGE_SIZE = 100;
+
 // === FUNÇÕES DE AJUDA ===
 function toast(titulo, msg) {
     const div = document.createElement("div");
@@ -93,12 +96,70 @@ function atualizarGrafico(crit, warn, total) {
 
 // === LÓGICA PRINCIPAL ===
 
+// Estado do sync incremental: página local + seq/ETag do último poll
+let incidentes = [];
+let syncSeq = null;
+let syncEtag = null;
+
+async function carregarCompleto() {
+    // A tabela mostra só a primeira página; os contadores vêm dos índices do backend
+    const [res, resStats] = await Promise.all([
+        fetch(`${API_BASE}/api/incidents?limit=${PAGE_SIZE}`, { cache: "no-store" }),
+        fetch(`${API_BASE}/api/incidents/stats`, { cache: "no-store" })
+    ]);
+    if (!res.ok || !resStats.ok) throw new Error("Erro na API");
+
+    incidentes = await res.json();
+    syncSeq = Number(res.headers.get("X-Incidents-Seq"));
+    syncEtag = null;
+
+    renderizarTabela(incidentes);
+    atualizarContadores(await resStats.json());
+}
+
+async function carregarDelta() {
+    const headers = syncEtag ? { "If-None-Match": syncEtag } : {};
+    const res = await fetch(`${API_BASE}/api/incidents?since=${syncSeq}`, { cache: "no-store", headers });
+    // 304: nada mudou, nem corpo nem re-render
+    if (res.status === 304) return;
+    if (!res.ok) throw new Error("Erro na API");
+
+    syncEtag = res.headers.get("ETag");
+    return aplicarDelta(await res.json());
+}
+
+// Mesmo formato para o poll (?since=) e para os eventos do stream
+async function aplicarDelta(delta) {
+    if (delta.reset) return carregarCompleto();
+    // Evento que já veio no snapshot inicial do stream
+    if (delta.seq <= syncSeq) return;
+
+    syncSeq = delta.seq;
+    if (delta.upserts.length === 0 && delta.deletes.length === 0) return;
+
+    // Atualizados ficam no lugar; novos entram no topo (o delta vem do mais recente pro mais antigo)
+    const apagados = new Set(delta.deletes);
+    const porId = new Map(delta.upserts.map(inc => [inc.id, inc]));
+    const atuais = incidentes
+        .filter(inc => !apagados.has(inc.id))
+        .map(inc => {
+            const novo = porId.get(inc.id);
+            porId.delete(inc.id);
+            return novo || inc;
+        });
+    // Atualização de um incidente antigo, fora da página, não sobe pro topo
+    const maisAntigo = atuais.length >= PAGE_SIZE ? atuais[atuais.length - 1].opened_at : "";
+    const novos = [...porId.values()].filter(inc => inc.opened_at >= maisAntigo);
+    incidentes = [...novos, ...atuais].slice(0, PAGE_SIZE);
+
+    renderizarTabela(incidentes);
+    atualizarContadores(delta.stats);
+}
+
 async function carregarDados() {
     try {
-        const res = await fetch(`${API_BASE}/api/incidents`);
-        if (!res.ok) throw new Error("Erro na API");
-
-        const lista = await res.json();
+        if (syncSeq === null) await carregarCompleto();
+        else await carregarDelta();
         
         if (statusBadge) {
             statusBadge.textContent = "ONLINE";
@@ -107,9 +168,6 @@ async function carregarDados() {
             statusBadge.style.textShadow = "0 0 10px var(--neon-lime)";
         }
 
-        renderizarTabela(lista);
-        atualizarContadores(lista);
-
     } catch (erro) {
         console.error(erro);
         if (statusBadge) {
@@ -139,10 +197,10 @@ function renderizarTabela(lista) {
     `).join("");
 }
 
-function atualizarContadores(lista) {
-    const crit = lista.filter(i => i.severity === "crit").length;
-    const warn = lista.filter(i => i.severity === "warn").length;
-    const total = lista.length;
+function atualizarContadores(stats) {
+    const crit = stats.by_severity.crit || 0;
+    const warn = stats.by_severity.warn || 0;
+    const total = stats.total;
     
     const elCrit = document.getElementById("countCrit");
     const elWarn = document.getElementById("countWarn");
@@ -174,6 +232,46 @@ async function criarIncidente() {
     }
 }
 
+// Lê uma resposta SSE (fetch + ReadableStream) e chama onDelta a cada pedaço.
+// fetch em vez de EventSource: dá para abortar e não reconecta sozinho.
+window.lerStreamSSE = async function(url, signal, onDelta) {
+    const res = await fetch(url, { signal, cache: "no-store" });
+    if (!res.ok) throw new Error("Erro na API");
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) return;
+        buffer += decoder.decode(value, { stream: true });
+
+        let fim;
+        while ((fim = buffer.indexOf("\n\n")) !== -1) {
+            const bloco = buffer.slice(0, fim);
+            buffer = buffer.slice(fim + 2);
+            if (bloco.startsWith("event: done")) return;
+            const linha = bloco.split("\n").find(l => l.startsWith("data: "));
+            if (linha) onDelta(JSON.parse(linha.slice(6)).delta || "");
+        }
+    }
+};
+
+// Renderiza HTML parcial no máximo uma vez por frame
+function renderizadorProgressivo(el) {
+    let html = "";
+    let agendado = false;
+    return (pedaco) => {
+        html += pedaco;
+        if (agendado) return;
+        agendado = true;
+        requestAnimationFrame(() => { agendado = false; el.innerHTML = html; });
+    };
+}
+
+// Análise em andamento: abortar fecha o stream e o backend para de gerar
+let analiseAtual = null;
+
 window.analisarIA = async function(id) {
     const section = document.getElementById("aiSection");
     const content = document.getElementById("aiContent");
@@ -181,20 +279,85 @@ window.analisarIA = async function(id) {
     if (section) section.style.display = "block";
     if (content) content.innerHTML = "Consultando a IA... aguarde...";
 
+    if (analiseAtual) analiseAtual.abort();
+    const controle = new AbortController();
+    analiseAtual = controle;
+
     try {
-        const res = await fetch(`${API_BASE}/api/incidents/${id}/explain`);
-        const data = await res.json();
-        if (content) content.innerHTML = data.explanation || "Sem resposta.";
+        const url = `${API_BASE}/api/incidents/${id}/explain/stream`;
+        let recebeu = false;
+        const render = renderizadorProgressivo(content);
+        await lerStreamSSE(url, controle.signal, (pedaco) => { recebeu = true; render(pedaco); });
+        if (!recebeu && content) content.innerHTML = "Sem resposta.";
     } catch (erro) {
-        if (content) content.innerHTML = "Erro ao consultar IA.";
+        if (erro.name !== "AbortError" && content) content.innerHTML = "Erro ao consultar IA.";
+    } finally {
+        if (analiseAtual === controle) analiseAtual = null;
     }
 };
 
+// Fechar o painel cancela a geração em andamento
+window.fecharIA = function() {
+    if (analiseAtual) analiseAtual.abort();
+    document.getElementById("aiSection").style.display = "none";
+};
+
+// === STREAM (PUSH) ===
+// WebSocket primeiro; se não abrir, EventSource (SSE). Enquanto nenhum dos dois
+// está conectado, o poll de 5s continua como rede de segurança.
+let streamAtivo = false;
+
+function streamUrl(protocolo) {
+    const base = API_BASE || window.location.origin;
+    const since = syncSeq === null ? "" : `?since=${syncSeq}`;
+    const url = `${base}/api/incidents/stream${since}`;
+    return protocolo === "ws" ? url.replace(/^http/, "ws") : url;
+}
+
+function aoReceber(texto) {
+    const evento = JSON.parse(texto);
+    if (evento.ping) return;
+    aplicarDelta(evento).catch(console.error);
+}
+
+function conectarStream(tentativa = 0) {
+    let abriu = false;
+    const ws = new WebSocket(streamUrl("ws"));
+    ws.onopen = () => {
+        abriu = true;
+        streamAtivo = true;
+        // Conexão saudável: a próxima queda volta a reconectar em 1s
+        tentativa = 0;
+    };
+    ws.onmessage = (e) => aoReceber(e.data);
+    ws.onclose = () => {
+        streamAtivo = false;
+        // Só a primeira tentativa decide que o WebSocket está bloqueado (proxy);
+        // numa reconexão o servidor pode estar só reiniciando
+        if (!abriu && tentativa === 0) return conectarSSE();
+        // Reconexão com backoff (o ?since= recupera o que passou)
+        setTimeout(() => conectarStream(tentativa + 1), Math.min(30000, 1000 * 2 ** tentativa));
+    };
+}
+
+function conectarSSE() {
+    if (!window.EventSource) return;
+    const es = new EventSource(streamUrl("sse"));
+    es.onopen = () => { streamAtivo = true; };
+    es.onmessage = (e) => aoReceber(e.data);
+    es.onerror = () => {
+        streamAtivo = false;
+        // O EventSource reconecta sozinho; a URL precisa do seq mais novo
+        es.close();
+        setTimeout(conectarSSE, 5000);
+    };
+}
+
 // === INICIALIZAÇÃO ===
 if (btnCreate) btnCreate.addEventListener("click", criarIncidente);
 if (btnRefresh) btnRefresh.addEventListener("click", carregarDados);
 
-carregarDados();
+carregarDados().then(() => conectarStream());
 
-// Auto-Refresh a cada 5 segundos
-setInterval(carregarDados, 5000);
\ No newline at end of file
+// Fallback: poll a cada 5 segundos só enquanto o stream está fora
+setInterval(() => { if (!streamAtivo) carregarDados(); }, 5000);